@@ -9,7 +9,10 @@ use `--resume <session_id>`.
 from __future__ import annotations
 
 import atexit
+import codecs
 import json
+import os
+import queue
 import re
 import signal
 import subprocess
@@ -17,6 +20,7 @@ import sys
 import tempfile
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Callable
@@ -25,6 +29,14 @@ import log
 from config import AgentConfig, build_base_command, build_env, resolve_flag
 
 MAX_DIFF_SIZE = 5 * 1024 * 1024  # 5 MB
+READ_CHUNK_SIZE = 256 * 1024  # 256 KiB
+BINARY_SNIFF_SIZE = 8000  # same window git uses to detect binary files
+# Every boundary str.splitlines() breaks on ("\r\n" counts once)
+_LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+_DIFF_BOUNDARY_RE = re.compile(r"^diff --git ", re.MULTILINE)
+_DIFF_HEADER_RE = re.compile(r"diff --git a/(.*?) b/(.*)")
+MAX_DIFF_WORKERS = min(32, (os.cpu_count() or 1) * 2)
 
 
 @dataclass
@@ -39,6 +51,13 @@ class FileDiff:
 
 @dataclass
 class TurnResult:
+    """One prompt/response cycle.
+
+    raw_events_jsonl is only populated when the gym runs with debug_mode or
+    a stream_callback (or retain_events=True); otherwise it is empty to keep
+    long sessions small.
+    """
+
     prompt: str
     result_text: str
     session_id: str | None
@@ -46,11 +65,16 @@ class TurnResult:
     cost_usd: float
     duration: float
     is_error: bool
-    raw_events: list[dict]
+    raw_events_jsonl: bytes  # one JSON event per line, as received
     tool_uses: list[dict]
     file_diffs: list[FileDiff]
     stderr_text: str = ""
 
+    @property
+    def raw_events(self) -> list[dict]:
+        """Stream events, parsed on demand from raw_events_jsonl."""
+        return [json.loads(line) for line in self.raw_events_jsonl.splitlines() if line]
+
 
 @dataclass
 class ConversationLog:
@@ -69,6 +93,38 @@ class ConversationLog:
         return sum(t.num_turns for t in self.turns)
 
 
+def _debug_print_delta(event: dict) -> None:
+    delta = event.get("delta", {})
+    if delta.get("type") == "text_delta":
+        text = delta.get("text", "")
+        print(text, end="", file=sys.stderr, flush=True)
+
+
+def _debug_print_block_start(event: dict) -> None:
+    cb = event.get("content_block", {})
+    if cb.get("type") == "tool_use":
+        name = cb.get("name", "unknown")
+        print(f"\n[TOOL: {name}]", file=sys.stderr, flush=True)
+
+
+def _debug_print_result(event: dict) -> None:
+    cost = event.get("cost_usd", 0)
+    turns = event.get("num_turns", 0)
+    session = event.get("session_id", "")
+    print(
+        f"\n--- Result: {turns} turn(s), ${cost:.4f}, session={session} ---",
+        file=sys.stderr, flush=True,
+    )
+
+
+# Debug printers keyed by stream event type; called once per event
+_DEBUG_EVENT_HANDLERS: dict[str, Callable[[dict], None]] = {
+    "content_block_delta": _debug_print_delta,
+    "content_block_start": _debug_print_block_start,
+    "result": _debug_print_result,
+}
+
+
 class ClaudeGym:
     """Drives the `claude` CLI via subprocess with structured JSON streaming."""
 
@@ -85,6 +141,7 @@ class ClaudeGym:
         stream_callback: Callable[[dict], None] | None = None,
         interactive: bool = False,
         agent_config: AgentConfig | None = None,
+        retain_events: bool | None = None,
     ):
         self._owns_work_dir = work_dir is None
         if work_dir is None:
@@ -112,8 +169,14 @@ class ClaudeGym:
         self.stream_callback = stream_callback
         self.interactive = interactive
         self.agent_config = agent_config or AgentConfig()
+        # None keeps raw events only when something is watching the stream
+        # (debug_mode or stream_callback); True/False forces either way
+        self.retain_events = retain_events
 
         self._session_id: str | None = None
+        self._env: dict[str, str] | None = None
+        self._cmd_cache: tuple[tuple, tuple[list[str], list[str]]] | None = None
+        self._clean_log_blocks: list[tuple[TurnResult, str]] = []
         self._torn_down = False
         self.conversation_log = ConversationLog()
 
@@ -131,6 +194,16 @@ class ClaudeGym:
         self.teardown()
         return False
 
+    def reset(self) -> None:
+        """Forget the conversation so the next prompt starts a new session.
+
+        Settings and the cached command/env are kept, so one gym can be
+        reused for independent runs in the same work_dir.
+        """
+        self._session_id = None
+        self._clean_log_blocks = []
+        self.conversation_log = ConversationLog()
+
     def _add_flag(self, cmd: list[str], canonical_flag: str, value: str | None = None) -> None:
         """Append a flag (and optional value) to cmd, respecting flag_overrides."""
         resolved = resolve_flag(self.agent_config, canonical_flag)
@@ -141,66 +214,74 @@ class ClaudeGym:
             cmd.append(value)
 
     def _build_command(self, prompt: str, resume_session: str | None = None) -> list[str]:
-        if self.interactive:
-            return self._build_interactive_command(prompt, resume_session)
-
-        cmd = list(build_base_command(self.agent_config))
-        self._add_flag(cmd, "-p", prompt)
-        self._add_flag(cmd, "--output-format", "stream-json")
-        self._add_flag(cmd, "--verbose")
-        self._add_flag(cmd, "--max-turns", str(self.max_turns))
-
-        if self.permission_mode:
-            self._add_flag(cmd, "--permission-mode", self.permission_mode)
-
-        if self.debug_mode or self.stream_callback:
-            self._add_flag(cmd, "--include-partial-messages")
-
+        """Splice the per-turn prompt and --resume onto the invariant flags."""
+        head, tail = self._invariant_command()
+        cmd = list(head)
+        if not self.interactive:
+            self._add_flag(cmd, "-p", prompt)
         if resume_session:
             self._add_flag(cmd, "--resume", resume_session)
+        cmd.extend(tail)
+        if self.interactive:
+            # Prompt goes as positional argument at the end
+            cmd.append(prompt)
+        return cmd
 
-        if self.model:
-            self._add_flag(cmd, "--model", self.model)
-
-        if self.max_budget_usd is not None:
-            self._add_flag(cmd, "--max-budget-usd", str(self.max_budget_usd))
-
-        if self.system_prompt:
-            self._add_flag(cmd, "--system-prompt", self.system_prompt)
+    def _invariant_command(self) -> tuple[list[str], list[str]]:
+        """Return (base command, flags) that don't change from turn to turn.
 
-        if self.allowed_tools:
-            self._add_flag(cmd, "--allowedTools")
-            cmd.extend(self.allowed_tools)
+        Built once and reused until one of the settings it depends on is
+        changed on the gym.
+        """
+        key = (
+            self.interactive, self.model, self.max_turns, self.max_budget_usd,
+            self.permission_mode, self.system_prompt,
+            tuple(self.allowed_tools or ()),
+            bool(self.debug_mode or self.stream_callback),
+            # By value: the config may be edited in place, and an id() can be
+            # reused once a replaced config is freed
+            self.agent_config.command,
+            tuple(self.agent_config.extra_args),
+            tuple(sorted(self.agent_config.flag_overrides.items())),
+        )
+        if self._cmd_cache is not None and self._cmd_cache[0] == key:
+            return self._cmd_cache[1]
 
-        return cmd
+        head = build_base_command(self.agent_config)
+        tail: list[str] = []
+        if not self.interactive:
+            self._add_flag(tail, "--output-format", "stream-json")
+            self._add_flag(tail, "--verbose")
+            self._add_flag(tail, "--max-turns", str(self.max_turns))
 
-    def _build_interactive_command(self, prompt: str, resume_session: str | None = None) -> list[str]:
-        cmd = list(build_base_command(self.agent_config))
+            if self.permission_mode:
+                self._add_flag(tail, "--permission-mode", self.permission_mode)
 
-        if resume_session:
-            self._add_flag(cmd, "--resume", resume_session)
+            if self.debug_mode or self.stream_callback:
+                self._add_flag(tail, "--include-partial-messages")
+        # No --max-turns in interactive mode: the user controls the session
 
         if self.model:
-            self._add_flag(cmd, "--model", self.model)
+            self._add_flag(tail, "--model", self.model)
 
-        # No --max-turns in interactive mode: the user controls the session
         if self.max_budget_usd is not None:
-            self._add_flag(cmd, "--max-budget-usd", str(self.max_budget_usd))
+            self._add_flag(tail, "--max-budget-usd", str(self.max_budget_usd))
 
         if self.system_prompt:
-            self._add_flag(cmd, "--system-prompt", self.system_prompt)
+            self._add_flag(tail, "--system-prompt", self.system_prompt)
 
         if self.allowed_tools:
-            self._add_flag(cmd, "--allowedTools")
-            cmd.extend(self.allowed_tools)
+            self._add_flag(tail, "--allowedTools")
+            tail.extend(self.allowed_tools)
 
-        # Prompt goes as positional argument at the end
-        cmd.append(prompt)
-
-        return cmd
+        self._cmd_cache = (key, (head, tail))
+        return head, tail
 
     def _build_env(self) -> dict[str, str]:
-        return build_env(self.agent_config)
+        # The sanitized env doesn't change mid-session, so copy os.environ once
+        if self._env is None:
+            self._env = build_env(self.agent_config)
+        return self._env
 
     def _git_ensure_baseline(self) -> str:
         """Capture the HEAD SHA to diff against later.
@@ -227,36 +308,89 @@ class ClaudeGym:
     def _parse_git_diff_output(self, diff_output: str) -> list[tuple[str, str]]:
         """Split multi-file git diff output into (path, diff_text) pairs."""
         chunks: list[tuple[str, str]] = []
-        # Split on "diff --git" boundaries
-        parts = re.split(r"(?=^diff --git )", diff_output, flags=re.MULTILINE)
-        for part in parts:
-            part = part.strip()
-            if not part.startswith("diff --git "):
-                continue
-            # Extract path from "diff --git a/foo b/foo"
-            header_match = re.match(r"diff --git a/(.*?) b/(.*)", part.split("\n")[0])
+        # Slice between "diff --git" boundaries directly rather than
+        # materializing re.split() parts and re-splitting each into lines
+        starts = [m.start() for m in _DIFF_BOUNDARY_RE.finditer(diff_output)]
+        for start, end in zip(starts, starts[1:] + [len(diff_output)]):
+            # Extract path from "diff --git a/foo b/foo" (`.` stops at the newline)
+            header_match = _DIFF_HEADER_RE.match(diff_output, start)
             if header_match:
-                path = header_match.group(2)
-            else:
-                continue
-            chunks.append((path, part))
+                chunks.append((header_match.group(2), diff_output[start:end].rstrip()))
         return chunks
 
-    def _git_diff_untracked(self, path: str) -> str:
-        """Produce unified diff text for an untracked (new) file."""
-        work = str(self._work_dir)
+    def _git_read_capped(self, args: list[str], limit: int) -> tuple[str, bool]:
+        """Run a git command and read at most `limit` bytes of its stdout.
+
+        Reads in fixed-size chunks and stops git once the cap is reached, so
+        oversized output is never buffered in full. Returns (text, truncated).
+        """
+        process = subprocess.Popen(
+            args, cwd=str(self._work_dir),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        chunks: list[bytes] = []
+        total = 0
+        truncated = False
+        while True:
+            chunk = process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            if total + len(chunk) > limit:
+                chunks.append(chunk[:limit - total])
+                truncated = True
+                break
+            chunks.append(chunk)
+            total += len(chunk)
+        if truncated:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        return b"".join(chunks).decode("utf-8", errors="replace"), truncated
+
+    def _git_ls_files(self, *args: str) -> list[str]:
+        """Run `git ls-files -z` and return the listed paths.
+
+        NUL-terminated output skips git's C-style quoting of unusual paths
+        (spaces, non-ASCII), so entries are usable as-is with no unquoting.
+        """
         result = subprocess.run(
-            ["git", "diff", "--no-index", "/dev/null", path],
-            cwd=work, capture_output=True, text=True,
+            ["git", "ls-files", "-z", *args], cwd=str(self._work_dir),
+            capture_output=True, encoding="utf-8", errors="surrogateescape",
         )
+        return [f for f in result.stdout.split("\0") if f]
+
+    def _git_diff_untracked(self, path: str) -> str:
+        """Produce unified diff text for an untracked (new) file.
+
+        Files larger than MAX_DIFF_SIZE are not diffed at all: an added-file
+        diff is the whole file again, and nothing downstream can use one
+        that size.
+        """
+        try:
+            size = (self._work_dir / path).stat().st_size
+        except OSError:
+            size = 0
+        if size > MAX_DIFF_SIZE:
+            log.warn(f"Skipping diff for {path}: {size} bytes (>{MAX_DIFF_SIZE}).")
+            return ""
         # git diff --no-index returns 1 when files differ, which is expected
-        return result.stdout
+        diff_text, _ = self._git_read_capped(
+            ["git", "diff", "--no-index", "/dev/null", path], MAX_DIFF_SIZE,
+        )
+        return diff_text
 
     def _git_compute_diffs(self, baseline_sha: str) -> list[FileDiff]:
         """Compute file diffs between baseline_sha and the current working tree."""
         work = str(self._work_dir)
         diffs: list[FileDiff] = []
 
+        # 0. Refresh the index stat cache once so the diff passes below can
+        #    trust (size, mtime) and skip re-hashing files that weren't changed
+        subprocess.run(
+            ["git", "update-index", "-q", "--refresh"],
+            cwd=work, capture_output=True,
+        )
+
         # 1. Classify tracked changes using NUL-terminated output for safety
         name_status = subprocess.run(
             ["git", "diff", baseline_sha, "--name-status", "-z"],
@@ -304,26 +438,15 @@ class ClaudeGym:
                     i += 1
 
         # 2. Get unified diff for tracked changes
-        tracked_diff = subprocess.run(
-            ["git", "diff", baseline_sha],
-            cwd=work, capture_output=True, text=True,
+        diff_output, truncated = self._git_read_capped(
+            ["git", "diff", baseline_sha], MAX_DIFF_SIZE,
         )
-        diff_output = tracked_diff.stdout
-        if len(diff_output) > MAX_DIFF_SIZE:
-            log.warn(f"Diff output is {len(diff_output)} bytes (>{MAX_DIFF_SIZE}), truncating.")
-            diff_output = diff_output[:MAX_DIFF_SIZE]
-        tracked_chunks = {
-            path: text for path, text in self._parse_git_diff_output(diff_output)
-        }
+        if truncated:
+            log.warn(f"Diff output exceeds {MAX_DIFF_SIZE} bytes, truncating.")
+        tracked_chunks = dict(self._parse_git_diff_output(diff_output))
 
         # 3. Find untracked (new) files
-        untracked = subprocess.run(
-            ["git", "ls-files", "--others", "--exclude-standard"],
-            cwd=work, capture_output=True, text=True,
-        )
-        untracked_files = [
-            f for f in untracked.stdout.strip().splitlines() if f
-        ]
+        untracked_files = self._git_ls_files("--others", "--exclude-standard")
 
         # Build FileDiff objects for tracked changes
         for path, (status, old_path) in sorted(tracked_files.items()):
@@ -338,9 +461,16 @@ class ClaudeGym:
                 old_path=old_path,
             ))
 
-        # Build FileDiff objects for untracked files
-        for path in sorted(untracked_files):
-            diff_text = self._git_diff_untracked(path)
+        # Build FileDiff objects for untracked files. ls-files already emits
+        # paths in sorted order. Each diff is its own git process, so run
+        # them concurrently (subprocess waits release the GIL)
+        if len(untracked_files) > 1:
+            workers = min(MAX_DIFF_WORKERS, len(untracked_files))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                untracked_diffs = list(pool.map(self._git_diff_untracked, untracked_files))
+        else:
+            untracked_diffs = [self._git_diff_untracked(p) for p in untracked_files]
+        for path, diff_text in zip(untracked_files, untracked_diffs):
             diffs.append(FileDiff(
                 path=path, status="added",
                 unified_diff=diff_text,
@@ -362,53 +492,78 @@ class ClaudeGym:
         return self._git_compute_diffs(result.stdout.strip())
 
     def _debug_print_event(self, event: dict) -> None:
-        etype = event.get("type")
-        if etype == "content_block_delta":
-            delta = event.get("delta", {})
-            if delta.get("type") == "text_delta":
-                text = delta.get("text", "")
-                print(text, end="", file=sys.stderr, flush=True)
-        elif etype == "content_block_start":
-            cb = event.get("content_block", {})
-            if cb.get("type") == "tool_use":
-                name = cb.get("name", "unknown")
-                print(f"\n[TOOL: {name}]", file=sys.stderr, flush=True)
-        elif etype == "result":
-            cost = event.get("cost_usd", 0)
-            turns = event.get("num_turns", 0)
-            session = event.get("session_id", "")
-            print(
-                f"\n--- Result: {turns} turn(s), ${cost:.4f}, session={session} ---",
-                file=sys.stderr, flush=True,
-            )
-
-    def _parse_stream_events(self, process: subprocess.Popen) -> tuple[list[dict], dict | None, int]:
-        events: list[dict] = []
+        handler = _DEBUG_EVENT_HANDLERS.get(event.get("type"))
+        if handler:
+            handler(event)
+
+    def _parse_stream_events(
+        self, process: subprocess.Popen,
+    ) -> tuple[bytes, dict | None, list[dict], int]:
+        """Read stream events in one pass.
+
+        Returns (raw JSONL, result event, tool uses, skipped line count).
+        Parsed events are dispatched and then dropped; raw lines are kept
+        per retain_events (by default, only with debug_mode or a callback).
+        """
+        retain = self.retain_events
+        if retain is None:
+            retain = self.debug_mode or self.stream_callback is not None
+        raw_lines: list[bytes] = []
+        tool_uses: list[dict] = []
         result_event: dict | None = None
         skipped_lines = 0
 
-        for raw_line in process.stdout:
+        # Drain stdout on its own thread so a slow debug printer or
+        # stream_callback never leaves the child blocked on a full pipe
+        lines: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+
+        def _drain_stdout():
+            try:
+                for raw in process.stdout:
+                    lines.put(raw)
+            except ValueError:
+                pass  # Stream closed
+            finally:
+                lines.put(None)
+
+        reader = threading.Thread(target=_drain_stdout, daemon=True)
+        reader.start()
+
+        for raw_line in iter(lines.get, None):
             line = raw_line.strip()
             if not line:
                 continue
-            try:
-                event = json.loads(line)
-            except json.JSONDecodeError:
+            # Every stream event is a JSON object; reject other lines up
+            # front rather than paying for a raised JSONDecodeError
+            event = None
+            if line[:1] == b"{":
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+            if event is None:
                 skipped_lines += 1
-                log.debug(f"[skip] non-JSON: {line[:120]}")
+                log.debug(f"[skip] non-JSON: {line[:120].decode('utf-8', 'replace')}")
                 continue
 
-            events.append(event)
+            if retain:
+                raw_lines.append(line)
 
             if self.debug_mode:
                 self._debug_print_event(event)
             if self.stream_callback:
                 self.stream_callback(event)
 
-            if event.get("type") == "result":
+            etype = event.get("type")
+            if etype == "content_block_start":
+                cb = event.get("content_block", {})
+                if cb.get("type") == "tool_use":
+                    tool_uses.append({"name": cb.get("name"), "id": cb.get("id")})
+            elif etype == "result":
                 result_event = event
 
-        return events, result_event, skipped_lines
+        reader.join()
+        return b"\n".join(raw_lines), result_event, tool_uses, skipped_lines
 
     def send_prompt(self, prompt: str, timeout: int = 300) -> TurnResult:
         """Send a prompt to claude and return structured results."""
@@ -430,13 +585,14 @@ class ClaudeGym:
             cmd,
             cwd=str(self._work_dir),
             env=self._build_env(),
+            # Bytes mode: json.loads decodes each line itself, so skip the
+            # TextIOWrapper decode + newline translation pass
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
         )
 
         # Drain stderr in a background thread to prevent pipe deadlock
-        stderr_chunks: list[str] = []
+        stderr_chunks: list[bytes] = []
 
         def _drain_stderr():
             try:
@@ -468,11 +624,11 @@ class ClaudeGym:
         watchdog.start()
 
         # Parse events
-        events, result_event, skipped_lines = self._parse_stream_events(process)
+        raw_jsonl, result_event, tool_uses, skipped_lines = self._parse_stream_events(process)
         process.wait()
         timed_out.set()  # Cancel watchdog
         stderr_thread.join(timeout=2)
-        stderr_text = "".join(stderr_chunks)
+        stderr_text = b"".join(stderr_chunks).decode("utf-8", errors="replace")
 
         if skipped_lines:
             log.debug(f"Skipped {skipped_lines} non-JSON line(s) from stream")
@@ -495,17 +651,6 @@ class ClaudeGym:
             if session_id:
                 self._session_id = session_id
 
-        # Extract tool uses from events
-        tool_uses = []
-        for ev in events:
-            if ev.get("type") == "content_block_start":
-                cb = ev.get("content_block", {})
-                if cb.get("type") == "tool_use":
-                    tool_uses.append({
-                        "name": cb.get("name"),
-                        "id": cb.get("id"),
-                    })
-
         # Compute diffs against baseline
         file_diffs = self._git_compute_diffs(baseline)
 
@@ -517,7 +662,7 @@ class ClaudeGym:
             cost_usd=cost_usd,
             duration=duration,
             is_error=is_error,
-            raw_events=events,
+            raw_events_jsonl=raw_jsonl,
             tool_uses=tool_uses,
             file_diffs=file_diffs,
             stderr_text=stderr_text,
@@ -561,43 +706,55 @@ class ClaudeGym:
             cost_usd=0.0,
             duration=duration,
             is_error=process.returncode != 0,
-            raw_events=[],
+            raw_events_jsonl=b"",
             tool_uses=[],
             file_diffs=file_diffs,
         )
         self.conversation_log.turns.append(turn)
         return turn
 
+    @staticmethod
+    def _format_turn(i: int, turn: TurnResult) -> str:
+        """Render one turn of the clean log as a single block."""
+        ellipsis = "..." if len(turn.result_text) > 500 else ""
+        block = (
+            f"\n--- Turn {i} ---\n"
+            f"Prompt: {turn.prompt}\n"
+            f"Response: {turn.result_text[:500]}{ellipsis}\n"
+        )
+        if turn.tool_uses:
+            block += f"Tools used: {', '.join(t['name'] for t in turn.tool_uses)}\n"
+        if turn.file_diffs:
+            block += f"Files changed: {', '.join(f'{d.path} ({d.status})' for d in turn.file_diffs)}\n"
+        block += f"Cost: ${turn.cost_usd:.4f} | Duration: {turn.duration:.1f}s | Turns: {turn.num_turns}"
+        if turn.is_error:
+            block += "\n*** ERROR ***"
+        return block
+
     def get_clean_log(self) -> str:
         """Format conversation as human-readable text."""
-        lines: list[str] = []
-        lines.append("=" * 60)
-        lines.append("CONVERSATION LOG")
-        lines.append("=" * 60)
-
-        for i, turn in enumerate(self.conversation_log.turns, 1):
-            lines.append(f"\n--- Turn {i} ---")
-            lines.append(f"Prompt: {turn.prompt}")
-            lines.append(f"Response: {turn.result_text[:500]}{'...' if len(turn.result_text) > 500 else ''}")
-
-            if turn.tool_uses:
-                tools = ", ".join(t["name"] for t in turn.tool_uses)
-                lines.append(f"Tools used: {tools}")
-
-            if turn.file_diffs:
-                changes = ", ".join(f"{d.path} ({d.status})" for d in turn.file_diffs)
-                lines.append(f"Files changed: {changes}")
-
-            lines.append(f"Cost: ${turn.cost_usd:.4f} | Duration: {turn.duration:.1f}s | Turns: {turn.num_turns}")
-            if turn.is_error:
-                lines.append("*** ERROR ***")
-
-        lines.append(f"\n{'=' * 60}")
-        lines.append(f"Totals: ${self.conversation_log.total_cost:.4f} | "
-                      f"{self.conversation_log.total_duration:.1f}s | "
-                      f"{self.conversation_log.total_num_turns} turn(s)")
-        lines.append("=" * 60)
-        return "\n".join(lines)
+        turns = self.conversation_log.turns
+        # The log is append-only, so keep rendered blocks and only format
+        # turns added since the last call (re-render if the log was replaced)
+        cached = self._clean_log_blocks
+        keep = 0
+        while keep < len(cached) and keep < len(turns) and cached[keep][0] is turns[keep]:
+            keep += 1
+        del cached[keep:]
+        for i in range(keep, len(turns)):
+            cached.append((turns[i], self._format_turn(i + 1, turns[i])))
+
+        rule = "=" * 60
+        blocks = "\n".join(block for _, block in cached)
+        return (
+            f"{rule}\nCONVERSATION LOG\n{rule}\n"
+            + (f"{blocks}\n" if blocks else "")
+            + f"\n{rule}\n"
+            f"Totals: ${self.conversation_log.total_cost:.4f} | "
+            f"{self.conversation_log.total_duration:.1f}s | "
+            f"{self.conversation_log.total_num_turns} turn(s)\n"
+            f"{rule}"
+        )
 
     def get_file_diffs(self) -> list[FileDiff]:
         """Get file diffs from the latest turn."""
@@ -613,21 +770,65 @@ class ClaudeGym:
         return all_diffs
 
     def get_file_content(self, relative_path: str) -> str | None:
-        """Read a file from work_dir by relative path."""
+        """Read a file from work_dir by relative path.
+
+        Returns None for missing, binary, or non-UTF-8 files. Binary files
+        are spotted from a NUL byte in the first block (git's heuristic), so
+        the rest of the file is never read or decoded.
+        """
+        fpath = self._work_dir / relative_path
+        try:
+            with open(fpath, "rb") as f:
+                head = f.read(BINARY_SNIFF_SIZE)
+                if b"\0" in head:
+                    return None
+                raw = head + f.read()
+            # Match text-mode newline translation
+            return raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def count_lines(self, relative_path: str) -> int | None:
+        """Count a file's lines without holding its content in memory.
+
+        Same None cases and newline handling as get_file_content(), so the
+        result equals len(get_file_content(path).splitlines()), including
+        the other boundaries splitlines() breaks on (\\f, \\x85, \\u2028...).
+        """
         fpath = self._work_dir / relative_path
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        breaks = 0
+        last = ""
+        sniffed = False
         try:
-            return fpath.read_text(encoding="utf-8")
+            with open(fpath, "rb") as f:
+                while block := f.read(READ_CHUNK_SIZE):
+                    if not sniffed and b"\0" in block[:BINARY_SNIFF_SIZE]:
+                        return None
+                    sniffed = True
+                    # A character split across blocks is held back by the decoder
+                    text = decoder.decode(block)
+                    if not text:
+                        continue
+                    breaks += sum(text.count(c) for c in _LINE_BREAKS) - text.count("\r\n")
+                    if last == "\r" and text[0] == "\n":
+                        breaks -= 1  # a "\r\n" pair straddling two blocks
+                    last = text[-1]
+                decoder.decode(b"", final=True)
         except (OSError, UnicodeDecodeError):
             return None
+        if not last:
+            return 0
+        # A missing final line break still ends a line
+        return breaks + (last not in _LINE_BREAKS)
+
+    def file_exists(self, relative_path: str) -> bool:
+        """Check that a regular file exists in work_dir without reading it."""
+        return (self._work_dir / relative_path).is_file()
 
     def list_files(self) -> list[str]:
         """List all files in work_dir, respecting .gitignore."""
-        result = subprocess.run(
-            ["git", "ls-files", "--cached", "--others", "--exclude-standard"],
-            cwd=str(self._work_dir),
-            capture_output=True, text=True,
-        )
-        return sorted(f for f in result.stdout.strip().splitlines() if f)
+        return sorted(self._git_ls_files("--cached", "--others", "--exclude-standard"))
 
     def teardown(self) -> None:
         """Clean up work directory if we created it."""
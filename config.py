@@ -99,6 +99,23 @@ def build_env(config: AgentConfig) -> dict[str, str]:
     return env
 
 
+_WHICH_CACHE: dict[str, str] = {}
+
+
+def _which(command: str) -> str | None:
+    """shutil.which, memoized so wizard restarts don't re-walk PATH.
+
+    Only hits are kept: a command reported missing is looked up again, in
+    case the user installed it or fixed PATH in the meantime.
+    """
+    found = _WHICH_CACHE.get(command)
+    if found is None:
+        found = shutil.which(command)
+        if found is not None:
+            _WHICH_CACHE[command] = found
+    return found
+
+
 def load_recent_projects() -> list[str]:
     """Read recent project directories from ~/.skilliterator/projects.json."""
     if not PROJECTS_FILE.is_file():
@@ -131,11 +148,12 @@ def remove_recent_project(path: str) -> None:
     PROJECTS_FILE.write_text(json.dumps(projects, indent=2) + "\n", encoding="utf-8")
 
 
-def smoke_test(config: AgentConfig) -> tuple[bool, str]:
+def smoke_test(config: AgentConfig, env: dict[str, str] | None = None) -> tuple[bool, str]:
     """Run a quick test to verify the CLI agent works.
 
     Runs: <cmd> <extra_args> -p "Say ok" --output-format stream-json
     Checks exit code 0 and that output contains a JSON line with "type": "result".
+    `env` defaults to build_env(config); callers that retry can pass it in.
     """
     cmd = build_base_command(config)
 
@@ -156,7 +174,7 @@ def smoke_test(config: AgentConfig) -> tuple[bool, str]:
             capture_output=True,
             text=True,
             timeout=60,
-            env=build_env(config),
+            env=env if env is not None else build_env(config),
         )
     except FileNotFoundError:
         return False, f"Command not found: {config.command} (ran: {cmd_str})"
@@ -170,7 +188,7 @@ def smoke_test(config: AgentConfig) -> tuple[bool, str]:
     # Check for a "type": "result" JSON line
     for line in proc.stdout.splitlines():
         line = line.strip()
-        if not line:
+        if not line.startswith("{"):
             continue
         try:
             event = json.loads(line)
@@ -186,57 +204,61 @@ def run_setup_wizard() -> AgentConfig:
     """Interactive first-run setup wizard. Shows current values as defaults when editing."""
     existing = load_config() if config_exists() else AgentConfig()
     is_edit = config_exists()
-
-    print("=" * 50)
-    if is_edit:
-        print("  Skill Iterator — Edit Configuration")
-    else:
-        print("  Skill Iterator — First-Run Setup")
-    print("=" * 50)
-    print()
-    print("This wizard configures which CLI agent command to use.")
-    print("Press Enter to keep the current value.\n")
-
-    # 1. Command
-    default_cmd = existing.command
-    cmd_input = input(f"CLI command [{default_cmd}]: ").strip()
-    command = cmd_input if cmd_input else default_cmd
-
-    # 2. Check if command exists on PATH
-    found = shutil.which(command)
-    if found:
-        print(f"  Found: {found}")
-    else:
-        print(f"  Warning: '{command}' not found on PATH.")
-        proceed = input("  Continue anyway? (y/n) [y]: ").strip().lower()
-        if proceed == "n":
-            print("  Aborting setup.")
-            return run_setup_wizard()  # restart
-
-    # 3. Extra args
-    default_args = " ".join(existing.extra_args) if existing.extra_args else "none"
-    args_input = input(f"\nExtra args (e.g. --team eng) [{default_args}]: ").strip()
-    if args_input:
-        extra_args = shlex.split(args_input)
-    elif is_edit:
-        extra_args = list(existing.extra_args)
-    else:
-        extra_args = []
-
-    config = AgentConfig(command=command, extra_args=extra_args)
-
-    # 4. Smoke test
-    print("\n[Running smoke test...]")
-    passed, message = smoke_test(config)
-    if passed:
-        print(f"  {message}")
-    else:
-        print(f"  FAILED: {message}")
-        choice = input("  (r)econfigure or (s)ave anyway? [r]: ").strip().lower()
-        if choice != "s":
-            return run_setup_wizard()  # restart
-
-    # 5. Save
-    save_config(config)
-    print(f"\nConfig saved to {CONFIG_FILE}")
-    return config
+    # The wizard only sets command/extra_args, so the subprocess env is the
+    # same on every attempt; build it once rather than per restart
+    env = build_env(AgentConfig())
+
+    while True:
+        print("=" * 50)
+        if is_edit:
+            print("  Skill Iterator — Edit Configuration")
+        else:
+            print("  Skill Iterator — First-Run Setup")
+        print("=" * 50)
+        print()
+        print("This wizard configures which CLI agent command to use.")
+        print("Press Enter to keep the current value.\n")
+
+        # 1. Command
+        default_cmd = existing.command
+        cmd_input = input(f"CLI command [{default_cmd}]: ").strip()
+        command = cmd_input if cmd_input else default_cmd
+
+        # 2. Check if command exists on PATH
+        found = _which(command)
+        if found:
+            print(f"  Found: {found}")
+        else:
+            print(f"  Warning: '{command}' not found on PATH.")
+            proceed = input("  Continue anyway? (y/n) [y]: ").strip().lower()
+            if proceed == "n":
+                print("  Aborting setup.")
+                continue  # restart
+
+        # 3. Extra args
+        default_args = " ".join(existing.extra_args) if existing.extra_args else "none"
+        args_input = input(f"\nExtra args (e.g. --team eng) [{default_args}]: ").strip()
+        if args_input:
+            extra_args = shlex.split(args_input)
+        elif is_edit:
+            extra_args = list(existing.extra_args)
+        else:
+            extra_args = []
+
+        config = AgentConfig(command=command, extra_args=extra_args)
+
+        # 4. Smoke test
+        print("\n[Running smoke test...]")
+        passed, message = smoke_test(config, env=env)
+        if passed:
+            print(f"  {message}")
+        else:
+            print(f"  FAILED: {message}")
+            choice = input("  (r)econfigure or (s)ave anyway? [r]: ").strip().lower()
+            if choice != "s":
+                continue  # restart
+
+        # 5. Save
+        save_config(config)
+        print(f"\nConfig saved to {CONFIG_FILE}")
+        return config
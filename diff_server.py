@@ -10,12 +10,17 @@ Zero third-party Python dependencies. Uses only stdlib + CDN JS/CSS.
 
 from __future__ import annotations
 
+import functools
+import html
 import json
+import re
+import sys
 import threading
 import webbrowser
+import zlib
 from dataclasses import dataclass, field
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Any
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Iterator
 
 from claude_gym import FileDiff
 
@@ -24,7 +29,7 @@ from claude_gym import FileDiff
 # Data types
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LineComment:
     file_path: str
     start_line: int
@@ -32,7 +37,7 @@ class LineComment:
     comment: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DiffFeedback:
     line_comments: list[LineComment] = field(default_factory=list)
     overall_feedback: str = ""
@@ -44,16 +49,14 @@ class DiffFeedback:
 
 def _format_feedback(fb: DiffFeedback) -> str:
     """Serialize DiffFeedback into natural-language text for derive_expectations()."""
-    parts: list[str] = []
-
-    if fb.overall_feedback.strip():
-        parts.append(f"Overall: {fb.overall_feedback.strip()}")
-
-    for lc in fb.line_comments:
-        if lc.start_line == lc.end_line:
-            parts.append(f"On {lc.file_path} line {lc.start_line}:\n{lc.comment}")
-        else:
-            parts.append(f"On {lc.file_path} lines {lc.start_line}-{lc.end_line}:\n{lc.comment}")
+    overall = fb.overall_feedback.strip()
+    parts = [f"Overall: {overall}"] if overall else []
+    parts.extend(
+        f"On {lc.file_path} line {lc.start_line}:\n{lc.comment}"
+        if lc.start_line == lc.end_line else
+        f"On {lc.file_path} lines {lc.start_line}-{lc.end_line}:\n{lc.comment}"
+        for lc in fb.line_comments
+    )
 
     return "\n\n".join(parts)
 
@@ -66,15 +69,25 @@ def _terminal_fallback(diffs: list[FileDiff]) -> str:
     """Collect feedback via terminal when browser UI is unavailable."""
     print("\n(Browser UI unavailable — falling back to terminal input)")
     print("Enter feedback (or 'done'). End with a blank line:")
+    tty = sys.stdin.isatty()
     lines: list[str] = []
+    append = lines.append
     while True:
-        try:
-            line = input("> ")
-        except EOFError:
-            break
+        if tty:
+            try:
+                line = input("> ")
+            except EOFError:
+                break
+        else:
+            # Piped input: plain readline, stopping at the blank line so the
+            # rest is left for later prompts
+            line = sys.stdin.readline()
+            if not line:
+                break
+            line = line.rstrip("\n")
         if line == "":
             break
-        lines.append(line)
+        append(line)
     return "\n".join(lines)
 
 
@@ -82,32 +95,147 @@ def _terminal_fallback(diffs: list[FileDiff]) -> str:
 # Port finder
 # ---------------------------------------------------------------------------
 
-def _create_server(handler_class: type) -> HTTPServer:
-    """Create an HTTPServer bound to an OS-assigned free port.
+class _ReviewHTTPServer(ThreadingHTTPServer):
+    """Threaded server: one thread per request, so an idle connection or a
+    slow POST can't hold up the page load."""
+
+    daemon_threads = True  # shutdown() doesn't wait on request threads
+    allow_reuse_address = True
+    request_queue_size = 16
+
+
+def _create_server(handler_class: type) -> ThreadingHTTPServer:
+    """Create a threaded HTTP server bound to an OS-assigned free port.
 
     Uses port 0 so the OS assigns and holds the port atomically,
     avoiding the race condition of bind/release/re-bind.
     """
-    return HTTPServer(("127.0.0.1", 0), handler_class)
+    return _ReviewHTTPServer(("127.0.0.1", 0), handler_class)
 
 
 # ---------------------------------------------------------------------------
 # HTML page (embedded)
 # ---------------------------------------------------------------------------
 
-def _build_html(diffs: list[FileDiff]) -> str:
-    """Build the complete HTML page with diff data injected."""
-    diff_data = []
-    for d in diffs:
-        diff_data.append({
-            "path": d.path,
-            "status": d.status,
-            "unified_diff": d.unified_diff,
-        })
+# Compact, non-ASCII passed through as UTF-8 rather than \uXXXX escapes,
+# and no circular-reference bookkeeping (the payload is plain lists/dicts)
+_PAYLOAD_ENCODER = json.JSONEncoder(
+    separators=(",", ":"), ensure_ascii=False, check_circular=False,
+)
+# For payloads with lone surrogates (undecodable path bytes kept by
+# surrogateescape), which UTF-8 can't encode: \udcXX escapes instead
+_ASCII_PAYLOAD_ENCODER = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+def _build_html(diffs: list[FileDiff]) -> list[bytes]:
+    """Build the HTML page with diff data injected, as UTF-8 chunks.
+
+    The static template halves are shared; only the diff JSON is new bytes.
+    Chunks are written to the socket in turn rather than concatenated.
+    """
+    key = tuple((d.path, d.status, d.unified_diff) for d in diffs)
+    return [_HTML_HEAD, _HTML_MID, _encode_diff_payload(key), _HTML_SUFFIX]
+
+
+@functools.lru_cache(maxsize=1)
+def _encode_diff_payload(key: tuple[tuple[str, str, str], ...]) -> bytes:
+    """Encode (path, status, unified_diff) triples as the page's JSON payload.
+
+    Only the latest payload is kept, so reviewing the same diffs again
+    skips re-encoding without holding on to earlier runs' diffs.
+    """
+    diff_data = [
+        {
+            "path": path,
+            "path_html": html.escape(path, quote=True),
+            "status": status,
+            "unified_diff": unified_diff,
+            "parsed": _parse_unified_diff(path, unified_diff),
+        }
+        for path, status, unified_diff in key
+    ]
+
+    # "<\/" keeps a literal "</script>" inside a diff from closing the tag
+    try:
+        return _PAYLOAD_ENCODER.encode(diff_data).replace("</", "<\\/").encode()
+    except UnicodeEncodeError:
+        return _ASCII_PAYLOAD_ENCODER.encode(diff_data).replace("</", "<\\/").encode()
+
+
+_HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
 
-    diff_json = json.dumps(diff_data)
 
-    return _HTML_TEMPLATE.replace("__DIFF_DATA_PLACEHOLDER__", diff_json)
+def _parse_unified_diff(path: str, text: str) -> dict[str, Any] | None:
+    """Parse one file's git diff into diff2html's DiffFile shape.
+
+    The browser hands this straight to Diff2HtmlUI, skipping its own parse.
+    Returns None when there are no hunks (binary, mode-only), leaving those
+    to diff2html's parser.
+    """
+    old_name = new_name = path
+    is_new = is_deleted = False
+    blocks: list[dict[str, Any]] = []
+    lines: list[dict[str, Any]] = []
+    added = deleted = 0
+    old_ln = new_ln = 0
+
+    for line in text.split("\n"):
+        if line.startswith("@@"):
+            m = _HUNK_HEADER_RE.match(line)
+            if m:
+                old_ln, new_ln = int(m.group(1)), int(m.group(2))
+                lines = []
+                blocks.append({
+                    "oldStartLine": old_ln,
+                    "oldStartLine2": None,
+                    "newStartLine": new_ln,
+                    "header": line,
+                    "lines": lines,
+                })
+                continue
+        if not blocks:
+            # File header: only meaningful before the first hunk, where a
+            # "---" line can't be a deleted "--" line
+            if line.startswith("--- "):
+                old_name = line[4:].removeprefix("a/")
+            elif line.startswith("+++ "):
+                new_name = line[4:].removeprefix("b/")
+            elif line.startswith("new file mode"):
+                is_new = True
+            elif line.startswith("deleted file mode"):
+                is_deleted = True
+            continue
+
+        first = line[:1]
+        if first == "+":
+            lines.append({"type": "insert", "content": line, "oldNumber": None, "newNumber": new_ln})
+            new_ln += 1
+            added += 1
+        elif first == "-":
+            lines.append({"type": "delete", "content": line, "oldNumber": old_ln, "newNumber": None})
+            old_ln += 1
+            deleted += 1
+        elif first == " ":
+            lines.append({"type": "context", "content": line, "oldNumber": old_ln, "newNumber": new_ln})
+            old_ln += 1
+            new_ln += 1
+        # "\ No newline at end of file" and the trailing "" carry no line
+
+    if not blocks:
+        return None
+
+    name = new_name if new_name != "/dev/null" else old_name
+    return {
+        "oldName": old_name,
+        "newName": new_name,
+        "language": name.rsplit(".", 1)[-1] if "." in name else "",
+        "isCombined": False,
+        "isGitDiff": True,
+        "isNew": is_new,
+        "isDeleted": is_deleted,
+        "addedLines": added,
+        "deletedLines": deleted,
+        "blocks": blocks,
+    }
 
 
 _HTML_TEMPLATE = r"""<!DOCTYPE html>
@@ -501,77 +629,109 @@ table.d2h-diff-table { font-family: 'SF Mono', 'Fira Code', monospace; font-size
 // Diff data injected by Python server
 window.__DIFF_DATA__ = __DIFF_DATA_PLACEHOLDER__;
 
-const comments = []; // {file_path, start_line, end_line, comment}
+const comments = new Map(); // id -> {file_path, start_line, end_line, comment}
+const commentCountByFile = new Map(); // file_path -> number of comments
+let nextCommentId = 0;
 let activeCommentForm = null;
 let isDragging = false;
 let dragAnchor = null; // {row, lineNum, filePath, fileIdx}
 let dragCurrent = null; // {row, lineNum}
 
+// Files rendered on load; the rest render when scrolled near
+const EAGER_RENDER_COUNT = 5;
+
+function renderFileBody(body, d, idx) {
+  if (d.unified_diff) {
+    renderDiff(body, d.unified_diff, d.path, idx, d.parsed);
+  } else {
+    body.innerHTML = '<div class="raw-diff">(no diff content)</div>';
+  }
+}
+
 function init() {
   const container = document.getElementById('diffContainer');
   const diffs = window.__DIFF_DATA__;
 
   document.getElementById('fileCount').textContent = diffs.length + ' file' + (diffs.length !== 1 ? 's' : '') + ' changed';
 
-  diffs.forEach((d, idx) => {
-    const section = document.createElement('div');
-    section.className = 'file-section';
-    section.dataset.path = d.path;
-
-    const badgeClass = 'badge-' + d.status;
-
-    section.innerHTML =
+  // Build every section's scaffolding as one string so the DOM is parsed
+  // and laid out once, not once per file
+  const parts = diffs.map((d, idx) =>
+    '<div class="file-section" data-path="' + d.path_html + '">' +
       '<div class="file-header" onclick="toggleSection(this.parentElement)">' +
-        '<span class="badge ' + badgeClass + '">' + d.status + '</span>' +
-        '<span class="path">' + escapeHtml(d.path) + '</span>' +
+        '<span class="badge badge-' + d.status + '">' + d.status + '</span>' +
+        '<span class="path">' + d.path_html + '</span>' +
         '<span class="comment-count" id="cc-' + idx + '">0</span>' +
         '<span class="toggle">&#9660;</span>' +
       '</div>' +
-      '<div class="file-body" id="body-' + idx + '"></div>';
+      '<div class="file-body" id="body-' + idx + '"></div>' +
+    '</div>');
+  container.innerHTML = parts.join('');
 
-    container.appendChild(section);
-
-    const body = document.getElementById('body-' + idx);
-
-    if (d.unified_diff) {
-      renderDiff(body, d.unified_diff, d.path, idx);
+  const sections = container.children;
+  const bodies = container.querySelectorAll('.file-body');
+  diffs.forEach((d, idx) => {
+    if (idx < EAGER_RENDER_COUNT || !lazyObserver) {
+      renderFileBody(bodies[idx], d, idx);
     } else {
-      body.innerHTML = '<div class="raw-diff">(no diff content)</div>';
+      // Placeholder keeps the scroll height roughly stable until rendered
+      bodies[idx].innerHTML = '<div class="diff-placeholder" style="height:200px"></div>';
+      lazyObserver.observe(sections[idx]);
     }
   });
 }
 
-function renderDiff(container, unifiedDiff, filePath, fileIdx) {
+const lazyObserver = window.IntersectionObserver ? new IntersectionObserver(function(entries, observer) {
+  const diffs = window.__DIFF_DATA__;
+  entries.forEach(function(entry) {
+    if (!entry.isIntersecting) return;
+    observer.unobserve(entry.target);
+    const body = entry.target.querySelector('.file-body');
+    const idx = parseInt(body.id.slice('body-'.length), 10);
+    body.innerHTML = '';
+    renderFileBody(body, diffs[idx], idx);
+  });
+}, {rootMargin: '500px'}) : null;
+
+function renderDiff(container, unifiedDiff, filePath, fileIdx, parsed) {
   // Try diff2html first
   if (window.Diff2HtmlUI) {
-    try {
-      const target = document.createElement('div');
-      target.id = 'diff2html-' + fileIdx;
-      container.appendChild(target);
-
-      const diff2htmlUi = new Diff2HtmlUI(target, unifiedDiff, {
-        drawFileList: false,
-        matching: 'lines',
-        outputFormat: 'line-by-line',
-        highlight: false,
-        renderNothingWhenEmpty: false,
-      });
-      diff2htmlUi.draw();
-
-      // Add click handlers once diff2html finishes rendering
-      waitForLineNumbers(target, function() {
-        attachLineClickHandlers(target, filePath, fileIdx);
-      });
+    const target = document.createElement('div');
+    target.id = 'diff2html-' + fileIdx;
+    container.appendChild(target);
+
+    // Pre-parsed by the server when it could; otherwise diff2html parses
+    if (drawDiff(target, parsed ? [parsed] : unifiedDiff, filePath, fileIdx)) {
       return;
-    } catch (e) {
-      console.warn('diff2html failed, falling back to raw:', e);
     }
+    target.remove();
+    renderRawDiff(container, unifiedDiff, filePath, fileIdx);
+    return;
   }
 
   // Fallback: raw diff with basic coloring
   renderRawDiff(container, unifiedDiff, filePath, fileIdx);
 }
 
+function drawDiff(target, diffInput, filePath, fileIdx) {
+  try {
+    const diff2htmlUi = new Diff2HtmlUI(target, diffInput, {
+      drawFileList: false,
+      matching: 'lines',
+      outputFormat: 'line-by-line',
+      highlight: false,
+      renderNothingWhenEmpty: false,
+    });
+    diff2htmlUi.draw();  // synchronous: line numbers exist once it returns
+
+    attachLineClickHandlers(target, filePath, fileIdx);
+    return true;
+  } catch (e) {
+    console.warn('diff2html failed, falling back to raw:', e);
+    return false;
+  }
+}
+
 function renderRawDiff(container, unifiedDiff, filePath, fileIdx) {
   const wrapper = document.createElement('div');
   wrapper.className = 'raw-diff';
@@ -627,40 +787,19 @@ function renderRawDiff(container, unifiedDiff, filePath, fileIdx) {
   container.appendChild(wrapper);
 }
 
-function waitForLineNumbers(target, callback) {
-  // If line numbers already exist, run immediately
-  if (target.querySelector('.d2h-code-linenumber')) {
-    callback();
-    return;
-  }
-  // Otherwise watch for DOM mutations until they appear
-  var observer = new MutationObserver(function(mutations, obs) {
-    if (target.querySelector('.d2h-code-linenumber')) {
-      obs.disconnect();
-      callback();
-    }
-  });
-  observer.observe(target, { childList: true, subtree: true });
-  // Safety timeout: stop watching after 3s and try anyway
-  setTimeout(function() {
-    observer.disconnect();
-    callback();
-  }, 3000);
-}
-
 function attachLineClickHandlers(target, filePath, fileIdx) {
-  const lineNumbers = target.querySelectorAll('.d2h-code-linenumber');
-  lineNumbers.forEach(function(ln) {
-    ln.addEventListener('mousedown', function(e) {
-      if (e.button !== 0) return;
-      e.stopPropagation();
-      var numEl = ln.querySelector('.line-num2') || ln.querySelector('.line-num1');
-      var lineNum = 0;
-      if (numEl) lineNum = parseInt(numEl.textContent.trim(), 10) || 0;
-      if (lineNum > 0) {
-        handleDragStart(e, ln.closest('tr'), lineNum, filePath, fileIdx);
-      }
-    });
+  // One delegated listener per diff instead of one per line number
+  target.addEventListener('mousedown', function(e) {
+    if (e.button !== 0) return;
+    const ln = e.target.closest('.d2h-code-linenumber');
+    if (!ln || !target.contains(ln)) return;
+    e.stopPropagation();
+    var numEl = ln.querySelector('.line-num2') || ln.querySelector('.line-num1');
+    var lineNum = 0;
+    if (numEl) lineNum = parseInt(numEl.textContent.trim(), 10) || 0;
+    if (lineNum > 0) {
+      handleDragStart(e, ln.closest('tr'), lineNum, filePath, fileIdx);
+    }
   });
 }
 
@@ -720,12 +859,14 @@ function saveComment(filePath, startLine, endLine, fileIdx) {
   const input = document.getElementById('commentInput');
   if (!input || !input.value.trim()) return;
 
-  comments.push({
+  const commentId = nextCommentId++;
+  comments.set(commentId, {
     file_path: filePath,
     start_line: startLine,
     end_line: endLine,
     comment: input.value.trim()
   });
+  commentCountByFile.set(filePath, (commentCountByFile.get(filePath) || 0) + 1);
 
   var lineLabel = startLine === endLine ? 'Line ' + startLine : 'Lines ' + startLine + '\u2013' + endLine;
 
@@ -739,7 +880,7 @@ function saveComment(filePath, startLine, endLine, fileIdx) {
           '<div class="comment-meta">' + lineLabel + '</div>' +
           '<div class="comment-text">' + escapeHtml(input.value.trim()) + '</div>' +
         '</div>' +
-        '<button class="btn-remove" onclick="removeComment(this, ' + (comments.length - 1) + ', ' + fileIdx + ')">&times;</button>' +
+        '<button class="btn-remove" onclick="removeComment(this, ' + commentId + ', ' + fileIdx + ')">&times;</button>' +
       '</div>';
     row.className = 'saved-comment-row';
     activeCommentForm = null;
@@ -749,18 +890,21 @@ function saveComment(filePath, startLine, endLine, fileIdx) {
   updateCommentCount(fileIdx);
 }
 
-function removeComment(btn, commentIdx, fileIdx) {
-  comments.splice(commentIdx, 1);
+function removeComment(btn, commentId, fileIdx) {
+  const c = comments.get(commentId);
+  if (c) {
+    comments.delete(commentId);
+    commentCountByFile.set(c.file_path, commentCountByFile.get(c.file_path) - 1);
+  }
   const row = btn.closest('tr');
   if (row) row.remove();
   updateCommentCount(fileIdx);
-  // Re-index remaining remove buttons (simplified — works for typical usage)
 }
 
 function updateCommentCount(fileIdx) {
   const diffs = window.__DIFF_DATA__;
   const filePath = diffs[fileIdx].path;
-  const count = comments.filter(function(c) { return c.file_path === filePath; }).length;
+  const count = commentCountByFile.get(filePath) || 0;
   const badge = document.getElementById('cc-' + fileIdx);
   if (badge) {
     badge.textContent = count;
@@ -772,12 +916,14 @@ function toggleSection(section) {
   section.classList.toggle('collapsed');
 }
 
+const HTML_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'};
+
 function escapeHtml(s) {
-  return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;').replace(/"/g,'&quot;');
+  return s.replace(/[&<>"]/g, function(c) { return HTML_ESCAPES[c]; });
 }
 
 function escapeAttr(s) {
-  return s.replace(/\\/g,'\\\\').replace(/'/g,"\\'");
+  return s.replace(/[\\']/g, '\\$&');
 }
 
 function getLineNumFromRow(tr) {
@@ -865,7 +1011,7 @@ document.addEventListener('mouseup', handleDragEnd);
 function submitFeedback() {
   const overall = document.getElementById('overallFeedback').value;
   const payload = {
-    line_comments: comments,
+    line_comments: Array.from(comments.values()),
     overall_feedback: overall
   };
 
@@ -909,23 +1055,56 @@ init();
 </body>
 </html>"""
 
+# Split and encode the static template once; each page build only has to
+# encode the diff JSON. The head (styles, page skeleton, CDN script tags) is
+# its own chunk so it reaches the browser before the diff payload.
+_HTML_PREFIX, _HTML_SUFFIX = (
+    part.encode() for part in _HTML_TEMPLATE.split("__DIFF_DATA_PLACEHOLDER__", 1)
+)
+_HEAD_END = _HTML_PREFIX.rindex(b"<script>\n")
+_HTML_HEAD, _HTML_MID = _HTML_PREFIX[:_HEAD_END], _HTML_PREFIX[_HEAD_END:]
+
 
 # ---------------------------------------------------------------------------
 # HTTP handler
 # ---------------------------------------------------------------------------
 
+def _gzip_chunks(chunks: list[bytes]) -> Iterator[bytes]:
+    """Gzip a chunked body as one stream, without joining the input.
+
+    Each input chunk is sync-flushed so the browser can decode it on arrival.
+    """
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for c in chunks:
+        yield comp.compress(c) + comp.flush(zlib.Z_SYNC_FLUSH)
+    yield comp.flush()
+
+
 class _DiffReviewHandler(BaseHTTPRequestHandler):
     """Handles GET / (HTML page) and POST /api/feedback, /api/cancel."""
 
+    # HTTP/1.1 for the chunked page, but every response closes its
+    # connection: handler state is class-level, so a kept-alive socket from
+    # one session could otherwise post feedback/cancel into the next
+    protocol_version = "HTTP/1.1"
+
     # These are set on the class before the server starts
-    html_content: str = ""
+    html_chunks: list[bytes] = []
+    html_gzip: list[bytes] | None = None  # compressed once, before serving
     feedback_result: dict[str, Any] | None = None
-    feedback_event: threading.Event = threading.Event()
+    feedback_event: threading.Event = threading.Event()  # cleared, never replaced
     cancelled: bool = False
+    # Guards feedback_result/cancelled and the event's set/check pairs
+    state_lock: threading.Lock = threading.Lock()
 
     def do_GET(self) -> None:
         if self.path == "/" or self.path == "":
-            self._send_response(200, "text/html", self.html_content.encode())
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                # Prepared by present_diff_for_review; compressed per request otherwise
+                body = self.html_gzip or _gzip_chunks(self.html_chunks)
+                self._send_streamed("text/html; charset=utf-8", body, content_encoding="gzip")
+            else:
+                self._send_streamed("text/html; charset=utf-8", self.html_chunks)
         else:
             self._send_response(404, "text/plain", b"Not found")
 
@@ -938,15 +1117,17 @@ class _DiffReviewHandler(BaseHTTPRequestHandler):
                 data = json.loads(body) if body else {}
             except json.JSONDecodeError:
                 data = {}
-            _DiffReviewHandler.feedback_result = data
-            _DiffReviewHandler.cancelled = False
-            _DiffReviewHandler.feedback_event.set()
+            with _DiffReviewHandler.state_lock:
+                _DiffReviewHandler.feedback_result = data
+                _DiffReviewHandler.cancelled = False
+                _DiffReviewHandler.feedback_event.set()
             self._send_response(200, "application/json", b'{"ok":true}')
 
         elif self.path == "/api/cancel":
-            if not _DiffReviewHandler.feedback_event.is_set():
-                _DiffReviewHandler.cancelled = True
-                _DiffReviewHandler.feedback_event.set()
+            with _DiffReviewHandler.state_lock:
+                if not _DiffReviewHandler.feedback_event.is_set():
+                    _DiffReviewHandler.cancelled = True
+                    _DiffReviewHandler.feedback_event.set()
             self._send_response(200, "application/json", b'{"ok":true}')
 
         else:
@@ -957,9 +1138,39 @@ class _DiffReviewHandler(BaseHTTPRequestHandler):
         self.send_header("Content-Type", content_type)
         self.send_header("Content-Length", str(len(body)))
         self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Connection", "close")
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_streamed(
+        self, content_type: str, chunks: Iterable[bytes],
+        content_encoding: str | None = None,
+    ) -> None:
+        """Send a body with chunked transfer encoding, flushing each chunk.
+
+        The browser can start on the page head (and its CDN fetches) while
+        the diff payload is still being written.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for chunk in chunks:
+            if chunk:  # a zero-length chunk would end the body
+                self.wfile.write(b"%x\r\n" % len(chunk))
+                self.wfile.write(chunk)
+                self.wfile.write(b"\r\n")
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def address_string(self) -> str:
+        # Plain client IP; never a reverse-DNS lookup
+        return self.client_address[0]
+
     def log_message(self, format: str, *args: Any) -> None:
         # Suppress request logging
         pass
@@ -980,10 +1191,13 @@ def present_diff_for_review(diffs: list[FileDiff], timeout: int = 600) -> str:
         return ""
 
     # Reset handler state
-    _DiffReviewHandler.feedback_result = None
-    _DiffReviewHandler.feedback_event = threading.Event()
-    _DiffReviewHandler.cancelled = False
-    _DiffReviewHandler.html_content = _build_html(diffs)
+    with _DiffReviewHandler.state_lock:
+        _DiffReviewHandler.feedback_result = None
+        _DiffReviewHandler.cancelled = False
+        _DiffReviewHandler.feedback_event.clear()
+    _DiffReviewHandler.html_chunks = _build_html(diffs)
+    # Compressed here, before any request thread exists to race on it
+    _DiffReviewHandler.html_gzip = list(_gzip_chunks(_DiffReviewHandler.html_chunks))
 
     server = _create_server(_DiffReviewHandler)
     port = server.server_address[1]
@@ -1007,20 +1221,25 @@ def present_diff_for_review(diffs: list[FileDiff], timeout: int = 600) -> str:
     except KeyboardInterrupt:
         print("\n  Interrupted.")
         server.shutdown()
+        server.server_close()
         return _terminal_fallback(diffs)
 
     server.shutdown()
+    server.server_close()
 
     if not got_feedback:
         print("\n  Timed out waiting for browser feedback.")
         return _terminal_fallback(diffs)
 
-    if _DiffReviewHandler.cancelled:
+    with _DiffReviewHandler.state_lock:
+        cancelled = _DiffReviewHandler.cancelled
+        data = _DiffReviewHandler.feedback_result or {}
+
+    if cancelled:
         print("  Browser session cancelled.")
         return _terminal_fallback(diffs)
 
     # Parse the feedback
-    data = _DiffReviewHandler.feedback_result or {}
     line_comments = []
     for lc in data.get("line_comments", []):
         line_comments.append(LineComment(
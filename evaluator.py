@@ -8,18 +8,64 @@ outputs) and runs them through ClaudeGym, producing structured pass/fail reports
 from __future__ import annotations
 
 import ast
+import functools
+import os
 import re
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 from claude_gym import ClaudeGym, FileDiff, TurnResult
 from config import AgentConfig
 
 
+@functools.lru_cache(maxsize=1024)
+def _compiled(pattern: str) -> re.Pattern[str]:
+    """Compile a content_matches regex once per process; suites reuse them."""
+    return re.compile(pattern)
+
+
+def _substrings_present(content: str, needles: list[str]) -> set[str]:
+    """Return the subset of needles that occur in content.
+
+    Duplicates are searched once. Each search is C-level str.__contains__,
+    which beats a pure-Python multi-pattern automaton at these sizes.
+    """
+    return {n for n in dict.fromkeys(needles) if n in content}
+
+
+# Every boundary str.splitlines() breaks on ("\r\n" counts once)
+_LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+
+def _count_lines(content: str) -> int:
+    """len(content.splitlines()) without building the list of lines."""
+    if not content:
+        return 0
+    breaks = sum(content.count(b) for b in _LINE_BREAKS) - content.count("\r\n")
+    return breaks + (not content.endswith(_LINE_BREAKS))
+
+
+def _cached_content(gym: ClaudeGym, path: str, cache: dict[str, str | None]) -> str | None:
+    """gym.get_file_content, read at most once per path for a given cache."""
+    if path not in cache:
+        cache[path] = gym.get_file_content(path)
+    return cache[path]
+
+
+def _parse_python(source: str, filename: str) -> ast.AST | SyntaxError:
+    """ast.parse, with a syntax error returned rather than raised."""
+    try:
+        return ast.parse(source, filename=filename)
+    except SyntaxError as e:
+        return e.with_traceback(None)  # don't keep parser frames alive
+
+
 def _glob_match(filepath: str, pattern: str) -> bool:
     """Regex-based glob matching: ** (zero+ dirs), * (single segment), ? (single char)."""
     i, regex = 0, []
@@ -43,17 +89,42 @@ def _glob_match(filepath: str, pattern: str) -> bool:
     return bool(re.fullmatch(''.join(regex), filepath))
 
 
-@dataclass
+def _as_tuples(obj: Any, *names: str) -> None:
+    """Store sequence arguments of a frozen dataclass's tuple fields as tuples.
+
+    Callers (and saved sessions) pass lists; normalizing keeps instances
+    immutable and equality independent of the sequence type passed in.
+    """
+    for name in names:
+        value = getattr(obj, name)
+        if not isinstance(value, tuple):
+            object.__setattr__(obj, name, tuple(value))
+
+
+@dataclass(slots=True, frozen=True)
 class FileExpectation:
     path: str = ""
     path_pattern: str = ""  # glob (e.g. "Tests/**/*.swift")
     should_exist: bool = True
-    content_contains: list[str] = field(default_factory=list)
-    content_matches: list[str] = field(default_factory=list)  # regex patterns
-    content_not_contains: list[str] = field(default_factory=list)
+    content_contains: tuple[str, ...] = ()
+    content_matches: tuple[str, ...] = ()  # regex patterns
+    content_not_contains: tuple[str, ...] = ()
     min_lines: int | None = None
     max_lines: int | None = None
     min_matching_files: int | None = None  # min files matching path_pattern
+    # content_matches compiled at construction; None if any pattern is invalid
+    _compiled_matches: list[re.Pattern[str]] | None = field(
+        default=None, init=False, repr=False, compare=False,
+    )
+
+    def __post_init__(self) -> None:
+        _as_tuples(self, "content_contains", "content_matches", "content_not_contains")
+        try:
+            object.__setattr__(
+                self, "_compiled_matches", [_compiled(p) for p in self.content_matches],
+            )
+        except re.error:
+            pass  # reported by validate(); raised again if the check runs
 
     def validate(self) -> list[str]:
         """Return list of validation error messages (empty = valid)."""
@@ -64,21 +135,29 @@ class FileExpectation:
             errors.append("FileExpectation: 'path' and 'path_pattern' are mutually exclusive")
         for pattern in self.content_matches:
             try:
-                re.compile(pattern)
+                _compiled(pattern)
             except re.error as e:
                 errors.append(f"FileExpectation: invalid regex '{pattern}': {e}")
         return errors
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CommandExpectation:
-    command: list[str] = field(default_factory=list)
-    stdout_contains: list[str] = field(default_factory=list)
-    stdout_not_contains: list[str] = field(default_factory=list)
-    stderr_contains: list[str] = field(default_factory=list)
-    stderr_not_contains: list[str] = field(default_factory=list)
+    command: tuple[str, ...] = ()
+    stdout_contains: tuple[str, ...] = ()
+    stdout_not_contains: tuple[str, ...] = ()
+    stderr_contains: tuple[str, ...] = ()
+    stderr_not_contains: tuple[str, ...] = ()
     returncode: int = 0
     timeout: int = 30
+    _cmd_str: str = field(default="", init=False, repr=False, compare=False)  # for messages
+
+    def __post_init__(self) -> None:
+        _as_tuples(
+            self, "command", "stdout_contains", "stdout_not_contains",
+            "stderr_contains", "stderr_not_contains",
+        )
+        object.__setattr__(self, "_cmd_str", " ".join(self.command))
 
     def validate(self) -> list[str]:
         """Return list of validation error messages (empty = valid)."""
@@ -90,17 +169,23 @@ class CommandExpectation:
         return errors
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DiffExpectation:
-    allowed_statuses: list[str] = field(default_factory=list)  # e.g. ["added"]
-    allowed_path_patterns: list[str] = field(default_factory=list)  # every diff must match one
-    disallowed_path_patterns: list[str] = field(default_factory=list)  # no diff may match any
+    allowed_statuses: tuple[str, ...] = ()  # e.g. ["added"]
+    allowed_path_patterns: tuple[str, ...] = ()  # every diff must match one
+    disallowed_path_patterns: tuple[str, ...] = ()  # no diff may match any
     min_files_changed: int | None = None
     max_files_changed: int | None = None
-    must_include_paths: list[str] = field(default_factory=list)  # paths that must be in diffs
+    must_include_paths: tuple[str, ...] = ()  # paths that must be in diffs
 
     _valid_statuses = {"added", "modified", "deleted", "renamed", "copied", "type_changed"}
 
+    def __post_init__(self) -> None:
+        _as_tuples(
+            self, "allowed_statuses", "allowed_path_patterns",
+            "disallowed_path_patterns", "must_include_paths",
+        )
+
     def validate(self) -> list[str]:
         """Return list of validation error messages (empty = valid)."""
         errors: list[str] = []
@@ -110,29 +195,34 @@ class DiffExpectation:
         return errors
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SyntaxExpectation:
     path: str
     language: str = "python"  # currently only "python" supported
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TaskDefinition:
     name: str
     description: str
     prompt: str
-    follow_up_prompts: list[str] = field(default_factory=list)
-    file_expectations: list[FileExpectation] = field(default_factory=list)
-    command_expectations: list[CommandExpectation] = field(default_factory=list)
-    syntax_expectations: list[SyntaxExpectation] = field(default_factory=list)
-    diff_expectations: list[DiffExpectation] = field(default_factory=list)
+    follow_up_prompts: tuple[str, ...] = ()
+    file_expectations: tuple[FileExpectation, ...] = ()
+    command_expectations: tuple[CommandExpectation, ...] = ()
+    syntax_expectations: tuple[SyntaxExpectation, ...] = ()
+    diff_expectations: tuple[DiffExpectation, ...] = ()
     max_turns: int = 10
     timeout: int = 300
     setup_files: dict[str, str] = field(default_factory=dict)  # path -> content
 
+    def __post_init__(self) -> None:
+        _as_tuples(
+            self, "follow_up_prompts", "file_expectations", "command_expectations",
+            "syntax_expectations", "diff_expectations",
+        )
+
 
-@dataclass
-class CheckResult:
+class CheckResult(NamedTuple):
     check_type: str  # "file", "syntax", "command", "diff"
     target: str
     passed: bool
@@ -140,7 +230,7 @@ class CheckResult:
     details: str = ""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TaskResult:
     task: TaskDefinition
     checks: list[CheckResult]
@@ -167,14 +257,64 @@ class TaskResult:
         )
 
 
+def _skip_commands_on_missing_files(
+    file_exps: list[FileExpectation], file_checks: list[CheckResult],
+    command_exps: list[CommandExpectation],
+) -> tuple[list[CommandExpectation], list[CheckResult]]:
+    """Split off commands that name a file whose existence check failed.
+
+    They can only fail (often by timing out), so each becomes a failed
+    "skipped" check instead. Returns (commands to run, skipped checks).
+    """
+    failed_targets = {c.target for c in file_checks if not c.passed}
+    missing = [
+        exp.path for exp in file_exps
+        if exp.path and exp.should_exist and exp.path in failed_targets
+    ]
+    if not missing:
+        return command_exps, []
+    # Whole arguments only, so a missing a.py doesn't match data.py or a.pyc;
+    # "./a.py" and "--file=a.py" still name it
+    missing_norm = {os.path.normpath(p): p for p in missing}
+
+    def named_path(arg: str) -> str | None:
+        for candidate in (arg, arg.partition("=")[2]):
+            if candidate:
+                path = missing_norm.get(os.path.normpath(candidate))
+                if path is not None:
+                    return path
+        return None
+
+    to_run: list[CommandExpectation] = []
+    skipped: list[CheckResult] = []
+    for exp in command_exps:
+        path = next((p for p in map(named_path, exp.command) if p is not None), None)
+        if path is None:
+            to_run.append(exp)
+        else:
+            skipped.append(CheckResult(
+                check_type="command", target=exp._cmd_str, passed=False,
+                message=f"Skipped `{exp._cmd_str}`: {path} is missing (skipped due to earlier failure)",
+            ))
+    return to_run, skipped
+
+
 class ClaudeEvaluator:
     """Runs tasks through ClaudeGym and verifies outcomes."""
 
     def __init__(self, debug_mode: bool = False, model: str | None = None,
-                 agent_config: AgentConfig | None = None):
+                 agent_config: AgentConfig | None = None, parallelism: int = 1,
+                 fail_fast: bool = True, command_parallelism: int = 1):
         self.debug_mode = debug_mode
         self.model = model
         self.agent_config = agent_config
+        self.parallelism = parallelism  # max tasks run_suite runs at once
+        # Max commands of one task run at once. Derived commands often depend
+        # on each other (build, then test), so they run in order by default
+        self.command_parallelism = command_parallelism
+        # Skip commands that reference a file already found missing
+        self.fail_fast = fail_fast
+        self._print_lock = threading.Lock()
 
     def run_task(self, task: TaskDefinition) -> TaskResult:
         """Execute a task and verify all expectations."""
@@ -210,10 +350,20 @@ class ClaudeEvaluator:
                     error = f"Follow-up returned error: {turn.result_text[:200]}"
 
             # Run verification checks
+            # File and syntax checks share one read per path; both run
+            # before any command that could change the files
             checks: list[CheckResult] = []
-            checks.extend(self._verify_file_expectations(gym, task.file_expectations))
-            checks.extend(self._verify_syntax_expectations(gym, task.syntax_expectations))
-            checks.extend(self._verify_command_expectations(gym, task.command_expectations))
+            content_cache: dict[str, str | None] = {}
+            file_checks = self._verify_file_expectations(
+                gym, task.file_expectations, content_cache)
+            checks.extend(file_checks)
+            checks.extend(self._verify_syntax_expectations(
+                gym, task.syntax_expectations, content_cache))
+            # Commands may run for a while; don't hold every file read so far
+            del content_cache
+
+            checks.extend(self._verify_commands_after_files(
+                gym, task.file_expectations, file_checks, task.command_expectations))
 
             # Diff expectations: collect all file_diffs across turns
             if task.diff_expectations:
@@ -248,9 +398,12 @@ class ClaudeEvaluator:
             gym.teardown()
 
     def _verify_file_expectations(
-        self, gym: ClaudeGym, expectations: list[FileExpectation]
+        self, gym: ClaudeGym, expectations: list[FileExpectation],
+        content_cache: dict[str, str | None] | None = None,
     ) -> list[CheckResult]:
         results: list[CheckResult] = []
+        if content_cache is None:
+            content_cache = {}
 
         for exp in expectations:
             # Glob-based matching: resolve pattern to concrete files
@@ -283,12 +436,26 @@ class ClaudeEvaluator:
                         min_lines=exp.min_lines,
                         max_lines=exp.max_lines,
                     )
-                    results.extend(self._verify_file_expectations(gym, [concrete]))
+                    results.extend(self._verify_file_expectations(gym, [concrete], content_cache))
                 continue
 
-            # Check existence
-            content = gym.get_file_content(exp.path)
-            exists = content is not None
+            # Check existence. With no content checks to run, the file is
+            # only stat'ed, or streamed through if its lines are counted.
+            has_content_checks = bool(
+                exp.content_contains or exp.content_matches or exp.content_not_contains
+            )
+            has_line_checks = exp.min_lines is not None or exp.max_lines is not None
+            streamed = not has_content_checks and exp.path not in content_cache
+            if not (has_content_checks or has_line_checks):
+                content = None
+                exists = gym.file_exists(exp.path)
+            elif streamed:
+                content = None
+                streamed_line_count = gym.count_lines(exp.path)
+                exists = streamed_line_count is not None
+            else:
+                content = _cached_content(gym, exp.path, content_cache)
+                exists = content is not None
 
             if exp.should_exist and not exists:
                 results.append(CheckResult(
@@ -309,10 +476,15 @@ class ClaudeEvaluator:
                 ))
                 continue
 
-            # File exists and should — run content checks
+            # File exists and should — run content checks. Each distinct
+            # needle is searched once, even if listed under both kinds.
+            present = _substrings_present(
+                content, [*exp.content_contains, *exp.content_not_contains],
+            )
+
             # Substring checks
             for substring in exp.content_contains:
-                found = substring in content
+                found = substring in present
                 results.append(CheckResult(
                     check_type="file", target=f"{exp.path} contains '{substring}'",
                     passed=found,
@@ -320,8 +492,12 @@ class ClaudeEvaluator:
                 ))
 
             # Regex checks
-            for pattern in exp.content_matches:
-                matched = bool(re.search(pattern, content))
+            patterns = exp._compiled_matches
+            if patterns is None:
+                patterns = [_compiled(p) for p in exp.content_matches]
+            for cpat in patterns:
+                pattern = cpat.pattern
+                matched = bool(cpat.search(content))
                 results.append(CheckResult(
                     check_type="file", target=f"{exp.path} matches /{pattern}/",
                     passed=matched,
@@ -330,7 +506,7 @@ class ClaudeEvaluator:
 
             # Not-contains checks
             for substring in exp.content_not_contains:
-                absent = substring not in content
+                absent = substring not in present
                 results.append(CheckResult(
                     check_type="file", target=f"{exp.path} excludes '{substring}'",
                     passed=absent,
@@ -338,7 +514,9 @@ class ClaudeEvaluator:
                 ))
 
             # Line count checks
-            line_count = len(content.splitlines())
+            if not has_line_checks:
+                continue
+            line_count = streamed_line_count if streamed else _count_lines(content)
             if exp.min_lines is not None:
                 ok = line_count >= exp.min_lines
                 results.append(CheckResult(
@@ -359,12 +537,17 @@ class ClaudeEvaluator:
         return results
 
     def _verify_syntax_expectations(
-        self, gym: ClaudeGym, expectations: list[SyntaxExpectation]
+        self, gym: ClaudeGym, expectations: list[SyntaxExpectation],
+        content_cache: dict[str, str | None] | None = None,
     ) -> list[CheckResult]:
         results: list[CheckResult] = []
+        if content_cache is None:
+            content_cache = {}
+        # Per call: a path's content is fixed for the task's checks
+        parsed_by_path: dict[str, ast.AST | SyntaxError] = {}
 
         for exp in expectations:
-            content = gym.get_file_content(exp.path)
+            content = _cached_content(gym, exp.path, content_cache)
             if content is None:
                 results.append(CheckResult(
                     check_type="syntax", target=exp.path, passed=False,
@@ -373,17 +556,19 @@ class ClaudeEvaluator:
                 continue
 
             if exp.language == "python":
-                try:
-                    ast.parse(content, filename=exp.path)
+                parsed = parsed_by_path.get(exp.path)
+                if parsed is None:
+                    parsed = parsed_by_path[exp.path] = _parse_python(content, exp.path)
+                if not isinstance(parsed, SyntaxError):
                     results.append(CheckResult(
                         check_type="syntax", target=exp.path, passed=True,
                         message=f"Python syntax valid: {exp.path}",
                     ))
-                except SyntaxError as e:
+                else:
                     results.append(CheckResult(
                         check_type="syntax", target=exp.path, passed=False,
-                        message=f"Python syntax error in {exp.path}: {e}",
-                        details=str(e),
+                        message=f"Python syntax error in {exp.path}: {parsed}",
+                        details=str(parsed),
                     ))
             else:
                 results.append(CheckResult(
@@ -396,84 +581,132 @@ class ClaudeEvaluator:
     def _verify_command_expectations(
         self, gym: ClaudeGym, expectations: list[CommandExpectation]
     ) -> list[CheckResult]:
+        """Run each expectation's command, in order.
+
+        With command_parallelism > 1 up to that many run at once, for
+        commands known not to depend on each other; results keep
+        expectation order either way.
+        """
+        return [c for checks in self._run_commands(gym, expectations) for c in checks]
+
+    def _verify_commands_after_files(
+        self, gym: ClaudeGym, file_exps: list[FileExpectation],
+        file_checks: list[CheckResult], command_exps: list[CommandExpectation],
+    ) -> list[CheckResult]:
+        """Command checks, in expectation order, once file checks are done.
+
+        With fail_fast, a command naming a file whose existence check
+        failed isn't run; its "skipped" check takes its place.
+        """
+        if not self.fail_fast:
+            return self._verify_command_expectations(gym, command_exps)
+        to_run, skipped = _skip_commands_on_missing_files(file_exps, file_checks, command_exps)
+        per_command = self._run_commands(gym, to_run)
+        checks: list[CheckResult] = []
+        ran = 0
+        skips = iter(skipped)
+        for exp in command_exps:
+            if ran < len(to_run) and exp is to_run[ran]:
+                checks.extend(per_command[ran])
+                ran += 1
+            else:
+                checks.append(next(skips))
+        return checks
+
+    def _run_commands(
+        self, gym: ClaudeGym, expectations: list[CommandExpectation]
+    ) -> list[list[CheckResult]]:
+        """Each expectation's checks, per command, in expectation order."""
+        work_dir = str(gym.work_dir)
+        if self.command_parallelism <= 1 or len(expectations) <= 1:
+            return [self._check_command(exp, work_dir) for exp in expectations]
+        workers = min(self.command_parallelism, len(expectations))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda exp: self._check_command(exp, work_dir), expectations))
+
+    @staticmethod
+    def _check_command(exp: CommandExpectation, work_dir: str) -> list[CheckResult]:
         results: list[CheckResult] = []
+        cmd_str = exp._cmd_str
+        if not exp.command:
+            return [CheckResult(
+                check_type="command", target=cmd_str, passed=False,
+                message="Command expectation has an empty command",
+            )]
+        try:
+            proc = subprocess.run(
+                exp.command,
+                cwd=work_dir,
+                capture_output=True,
+                text=True,
+                timeout=exp.timeout,
+            )
 
-        for exp in expectations:
-            cmd_str = " ".join(exp.command)
-            try:
-                proc = subprocess.run(
-                    exp.command,
-                    cwd=str(gym.work_dir),
-                    capture_output=True,
-                    text=True,
-                    timeout=exp.timeout,
-                )
-
-                # Return code check
-                rc_ok = proc.returncode == exp.returncode
+            # Return code check
+            rc_ok = proc.returncode == exp.returncode
+            results.append(CheckResult(
+                check_type="command",
+                target=f"{cmd_str} (rc={exp.returncode})",
+                passed=rc_ok,
+                message=f"{'OK' if rc_ok else 'FAIL'}: `{cmd_str}` returned {proc.returncode} (expected {exp.returncode})",
+                details=proc.stderr[:300] if not rc_ok else "",
+            ))
+
+            # Stdout substring checks
+            for substring in exp.stdout_contains:
+                found = substring in proc.stdout
                 results.append(CheckResult(
                     check_type="command",
-                    target=f"{cmd_str} (rc={exp.returncode})",
-                    passed=rc_ok,
-                    message=f"{'OK' if rc_ok else 'FAIL'}: `{cmd_str}` returned {proc.returncode} (expected {exp.returncode})",
-                    details=proc.stderr[:300] if not rc_ok else "",
+                    target=f"{cmd_str} stdout contains '{substring}'",
+                    passed=found,
+                    message=f"{'Found' if found else 'Missing'}: '{substring}' in stdout of `{cmd_str}`",
+                    details=f"stdout: {proc.stdout[:300]}" if not found else "",
                 ))
 
-                # Stdout substring checks
-                for substring in exp.stdout_contains:
-                    found = substring in proc.stdout
-                    results.append(CheckResult(
-                        check_type="command",
-                        target=f"{cmd_str} stdout contains '{substring}'",
-                        passed=found,
-                        message=f"{'Found' if found else 'Missing'}: '{substring}' in stdout of `{cmd_str}`",
-                        details=f"stdout: {proc.stdout[:300]}" if not found else "",
-                    ))
-
-                # Stdout negative checks
-                for substring in exp.stdout_not_contains:
-                    absent = substring not in proc.stdout
-                    results.append(CheckResult(
-                        check_type="command",
-                        target=f"{cmd_str} stdout excludes '{substring}'",
-                        passed=absent,
-                        message=f"{'Excluded' if absent else 'Found (unexpected)'}: '{substring}' in stdout of `{cmd_str}`",
-                        details=f"stdout: {proc.stdout[:300]}" if not absent else "",
-                    ))
-
-                # Stderr substring checks
-                for substring in exp.stderr_contains:
-                    found = substring in proc.stderr
-                    results.append(CheckResult(
-                        check_type="command",
-                        target=f"{cmd_str} stderr contains '{substring}'",
-                        passed=found,
-                        message=f"{'Found' if found else 'Missing'}: '{substring}' in stderr of `{cmd_str}`",
-                        details=f"stderr: {proc.stderr[:300]}" if not found else "",
-                    ))
-
-                # Stderr negative checks
-                for substring in exp.stderr_not_contains:
-                    absent = substring not in proc.stderr
-                    results.append(CheckResult(
-                        check_type="command",
-                        target=f"{cmd_str} stderr excludes '{substring}'",
-                        passed=absent,
-                        message=f"{'Excluded' if absent else 'Found (unexpected)'}: '{substring}' in stderr of `{cmd_str}`",
-                        details=f"stderr: {proc.stderr[:300]}" if not absent else "",
-                    ))
+            # Stdout negative checks
+            for substring in exp.stdout_not_contains:
+                absent = substring not in proc.stdout
+                results.append(CheckResult(
+                    check_type="command",
+                    target=f"{cmd_str} stdout excludes '{substring}'",
+                    passed=absent,
+                    message=f"{'Excluded' if absent else 'Found (unexpected)'}: '{substring}' in stdout of `{cmd_str}`",
+                    details=f"stdout: {proc.stdout[:300]}" if not absent else "",
+                ))
 
-            except subprocess.TimeoutExpired:
+            # Stderr substring checks
+            for substring in exp.stderr_contains:
+                found = substring in proc.stderr
                 results.append(CheckResult(
-                    check_type="command", target=cmd_str, passed=False,
-                    message=f"Command timed out after {exp.timeout}s: `{cmd_str}`",
+                    check_type="command",
+                    target=f"{cmd_str} stderr contains '{substring}'",
+                    passed=found,
+                    message=f"{'Found' if found else 'Missing'}: '{substring}' in stderr of `{cmd_str}`",
+                    details=f"stderr: {proc.stderr[:300]}" if not found else "",
                 ))
-            except FileNotFoundError:
+
+            # Stderr negative checks
+            for substring in exp.stderr_not_contains:
+                absent = substring not in proc.stderr
                 results.append(CheckResult(
-                    check_type="command", target=cmd_str, passed=False,
-                    message=f"Command not found: `{cmd_str}`",
+                    check_type="command",
+                    target=f"{cmd_str} stderr excludes '{substring}'",
+                    passed=absent,
+                    message=f"{'Excluded' if absent else 'Found (unexpected)'}: '{substring}' in stderr of `{cmd_str}`",
+                    details=f"stderr: {proc.stderr[:300]}" if not absent else "",
                 ))
 
+        except subprocess.TimeoutExpired:
+            results.append(CheckResult(
+                check_type="command", target=cmd_str, passed=False,
+                message=f"Command timed out after {exp.timeout}s: `{cmd_str}`",
+            ))
+        except FileNotFoundError:
+            results.append(CheckResult(
+                check_type="command", target=cmd_str, passed=False,
+                message=f"Command not found: `{cmd_str}`",
+            ))
+
         return results
 
     def _verify_diff_expectations(
@@ -548,23 +781,33 @@ class ClaudeEvaluator:
         return results
 
     def run_suite(self, tasks: list[TaskDefinition]) -> list[TaskResult]:
-        """Run multiple tasks sequentially."""
-        results: list[TaskResult] = []
-        for task in tasks:
-            if self.debug_mode:
+        """Run multiple tasks, up to `parallelism` at a time.
+
+        Each task has its own ClaudeGym work dir, so tasks are independent;
+        results are returned in task order.
+        """
+        if self.parallelism <= 1 or len(tasks) <= 1:
+            return [self._run_suite_task(task) for task in tasks]
+        with ThreadPoolExecutor(max_workers=min(self.parallelism, len(tasks))) as pool:
+            return list(pool.map(self._run_suite_task, tasks))
+
+    def _run_suite_task(self, task: TaskDefinition) -> TaskResult:
+        if self.debug_mode:
+            with self._print_lock:
                 print(f"\n{'='*60}", file=sys.stderr)
                 print(f"TASK: {task.name}", file=sys.stderr)
                 print(f"{'='*60}", file=sys.stderr)
-            result = self.run_task(task)
-            results.append(result)
-        return results
+        return self.run_task(task)
 
     @staticmethod
     def print_report(results: list[TaskResult]) -> None:
         """Print a formatted pass/fail report."""
-        print("\n" + "=" * 60)
-        print("EVALUATION REPORT")
-        print("=" * 60)
+        # Built up and written once rather than a print() per line
+        buf: list[str] = []
+        add = buf.append
+        add("\n" + "=" * 60)
+        add("EVALUATION REPORT")
+        add("=" * 60)
 
         total_passed = 0
         total_tasks = len(results)
@@ -573,24 +816,25 @@ class ClaudeEvaluator:
         for result in results:
             total_cost += result.total_cost
             status = "PASS" if result.passed else "FAIL"
-            print(f"\n[{status}] {result.task.name}")
-            print(f"  Description: {result.task.description}")
-            print(f"  Cost: ${result.total_cost:.4f}")
+            add(f"\n[{status}] {result.task.name}")
+            add(f"  Description: {result.task.description}")
+            add(f"  Cost: ${result.total_cost:.4f}")
 
             if result.error:
-                print(f"  Error: {result.error}")
+                add(f"  Error: {result.error}")
 
             if result.passed:
                 total_passed += 1
 
             for check in result.checks:
                 icon = "+" if check.passed else "-"
-                print(f"  [{icon}] {check.message}")
+                add(f"  [{icon}] {check.message}")
                 if check.details and not check.passed:
                     for line in check.details.splitlines()[:5]:
-                        print(f"      {line}")
+                        add(f"      {line}")
 
-        print(f"\n{'='*60}")
-        print(f"Results: {total_passed}/{total_tasks} tasks passed")
-        print(f"Total cost: ${total_cost:.4f}")
-        print("=" * 60)
+        add(f"\n{'='*60}")
+        add(f"Results: {total_passed}/{total_tasks} tasks passed")
+        add(f"Total cost: ${total_cost:.4f}")
+        add("=" * 60)
+        sys.stdout.write("\n".join(buf) + "\n")
@@ -7,6 +7,7 @@ No stdlib `logging` — too heavy for a CLI tool.
 
 from __future__ import annotations
 
+import atexit
 import sys
 
 _verbose = False
@@ -21,17 +22,49 @@ def is_verbose() -> bool:
     return _verbose
 
 
+def _write(msg: str, flush: bool) -> None:
+    """Write a line to stderr's byte buffer, flushing when asked or when
+    stderr is a terminal (so it shows before the next prompt).
+
+    Falls back to the text stream when stderr has no buffer (e.g. replaced
+    by a StringIO).
+    """
+    stream = sys.stderr
+    flush = flush or stream.isatty()
+    buf = getattr(stream, "buffer", None)
+    if buf is None:
+        stream.write(msg + "\n")
+        out = stream
+    else:
+        buf.write((msg + "\n").encode(stream.encoding or "utf-8", "replace"))
+        out = buf
+    if flush:
+        out.flush()
+
+
+def _flush() -> None:
+    try:
+        sys.stderr.flush()
+    except (OSError, ValueError):
+        pass
+
+
+# Debug lines redirected to a file or pipe are left in the buffer; make
+# sure they are written out
+atexit.register(_flush)
+
+
 def debug(msg: str) -> None:
-    """Print to stderr only when verbose mode is on."""
+    """Print to stderr only when verbose mode is on (buffered unless on a terminal)."""
     if _verbose:
-        print(msg, file=sys.stderr, flush=True)
+        _write(msg, flush=False)
 
 
 def warn(msg: str) -> None:
     """Always print warning to stderr."""
-    print(f"Warning: {msg}", file=sys.stderr, flush=True)
+    _write(f"Warning: {msg}", flush=True)
 
 
 def error(msg: str) -> None:
     """Always print error to stderr."""
-    print(f"Error: {msg}", file=sys.stderr, flush=True)
+    _write(f"Error: {msg}", flush=True)
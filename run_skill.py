@@ -11,15 +11,25 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import atexit
+import dataclasses
 import difflib
+import functools
+import hashlib
 import json
 import os
 import re
 import shutil
+import signal
+import stat
 import subprocess
 import sys
+import tempfile
+import threading
 import uuid
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Any, Callable, Iterable, TypeVar
 
 import log
 from claude_gym import ClaudeGym, FileDiff
@@ -45,10 +55,15 @@ from evaluator import (
 
 
 SCRIPT_DIR = Path(__file__).resolve().parent
+_SCRIPT_STR = str(SCRIPT_DIR)
 SKILLS_DIR = Path.home() / ".claude" / "skills"
 SESSION_FILE = Path.home() / ".skilliterator" / "session.json"
+# Bump the version directory when the stored expectation schema changes
+DERIVE_CACHE_DIR = Path.home() / ".skilliterator" / "cache" / "derivations" / "v1"
 MAX_INPUT_LINES = 500
 
+_T = TypeVar("_T")
+
 
 def save_session(
     skill: str, task_prompt: str, project_dir: str,
@@ -63,19 +78,21 @@ def save_session(
         "task_prompt": task_prompt,
         "project_dir": project_dir,
         "run_number": run_number,
-        "file_expectations": [
-            {k: v for k, v in fe.__dict__.items()} for fe in file_exps
-        ],
-        "command_expectations": [
-            {k: v for k, v in ce.__dict__.items()} for ce in cmd_exps
-        ],
-        "diff_expectations": [
-            {k: v for k, v in de.__dict__.items() if not k.startswith("_")} for de in diff_exps
-        ],
+        "file_expectations": [_expectation_fields(fe) for fe in file_exps],
+        "command_expectations": [_expectation_fields(ce) for ce in cmd_exps],
+        "diff_expectations": [_expectation_fields(de) for de in diff_exps],
     }
     SESSION_FILE.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
 
 
+def _expectation_fields(exp: Any) -> dict[str, Any]:
+    """Public dataclass fields of an expectation, for JSON (slots: no __dict__)."""
+    return {
+        f.name: getattr(exp, f.name)
+        for f in dataclasses.fields(exp) if not f.name.startswith("_")
+    }
+
+
 def load_session() -> dict | None:
     """Load saved session if it exists."""
     if not SESSION_FILE.is_file():
@@ -94,32 +111,61 @@ def delete_session() -> None:
         pass
 
 
+def _parse_frontmatter(lines: Iterable[str], default_name: str) -> tuple[str, str]:
+    """Return (name, description) from a leading YAML frontmatter block.
+
+    The block sits between "---" lines; lines are consumed only up to its
+    end. Without a complete block the defaults ("default_name", "") apply.
+    """
+    it = iter(lines)
+    if next(it, "").strip() != "---":
+        return default_name, ""
+    name, description = default_name, ""
+    for line in it:
+        if line.strip() == "---":
+            return name, description
+        if line.startswith("name:"):
+            name = line.split(":", 1)[1].strip()
+        elif line.startswith("description:"):
+            description = line.split(":", 1)[1].strip()
+    return default_name, ""
+
+
+# SKILL.md path -> ((st_mtime_ns, st_size), parsed skill), so a rescan
+# only re-reads the files that changed
+_SKILLS_CACHE: dict[str, tuple[tuple[int, int], dict[str, str]]] = {}
+
+
 def discover_skills() -> list[dict[str, str]]:
     """Scan ~/.claude/skills/ for SKILL.md files and parse their frontmatter."""
     skills: list[dict[str, str]] = []
-    if not SKILLS_DIR.is_dir():
+    try:
+        entries = sorted(os.scandir(SKILLS_DIR), key=lambda e: e.name)
+    except OSError:
         return skills
-    for skill_dir in sorted(SKILLS_DIR.iterdir()):
-        skill_file = skill_dir / "SKILL.md"
-        if not skill_file.is_file():
+    for entry in entries:
+        skill_file = os.path.join(entry.path, "SKILL.md")
+        try:
+            st = os.stat(skill_file)
+        except OSError:
+            continue
+        if not stat.S_ISREG(st.st_mode):
             continue
-        content = skill_file.read_text()
-        # Parse YAML frontmatter (between --- delimiters)
-        fm_match = re.match(r"^---\s*\n(.*?)\n---\s*\n", content, re.DOTALL)
-        name = skill_dir.name
-        description = ""
-        if fm_match:
-            for line in fm_match.group(1).splitlines():
-                if line.startswith("name:"):
-                    name = line.split(":", 1)[1].strip()
-                elif line.startswith("description:"):
-                    description = line.split(":", 1)[1].strip()
-        skills.append({
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _SKILLS_CACHE.get(skill_file)
+        if cached is not None and cached[0] == key:
+            skills.append(cached[1])
+            continue
+        # Only the frontmatter is read; select_skill() loads the chosen body
+        with open(skill_file) as f:
+            name, description = _parse_frontmatter(f, entry.name)
+        skill = {
             "name": name,
             "description": description,
-            "content": content,
-            "path": str(skill_file),
-        })
+            "path": skill_file,
+        }
+        _SKILLS_CACHE[skill_file] = (key, skill)
+        skills.append(skill)
     return skills
 
 
@@ -137,8 +183,13 @@ def select_skill(skills: list[dict[str, str]]) -> str:
                 idx = int(choice)
                 if 1 <= idx <= len(skills):
                     selected = skills[idx - 1]
+                    try:
+                        content = Path(selected["path"]).read_text()
+                    except OSError as e:
+                        print(f"Could not read {selected['path']}: {e}\n")
+                        continue
                     print(f"\nLoaded: {selected['name']}")
-                    return selected["content"]
+                    return content
                 elif idx == len(skills) + 1:
                     # Fall through to manual entry
                     pass
@@ -164,84 +215,134 @@ def check_prerequisites(config: AgentConfig | None = None) -> str | None:
     return None
 
 
-def validate_project_dir(project_dir: Path, *, skip_clean_check: bool = False) -> str | None:
-    """Return an error message if the project dir is unsafe, else None."""
-    # Block dangerous directories
+def _git_status(project_dir: Path, untracked: bool = True) -> tuple[str, str]:
+    """Return (branch name, change entries) from one `git status`.
+
+    The branch is "detached HEAD" off a branch, or "unknown" if git reports
+    none. The entries are the raw NUL-terminated records after the headers,
+    empty for a clean tree; _count_status_entries() counts them. With
+    untracked=False git skips the untracked-file walk and new files are not
+    reported. Raises subprocess.TimeoutExpired / FileNotFoundError if git
+    can't run.
+    """
+    out = subprocess.run(
+        ["git", "status", "--porcelain=v2", "--branch", "-z",
+         "--untracked-files=normal" if untracked else "--untracked-files=no"],
+        cwd=str(project_dir),
+        capture_output=True,
+        # -z leaves paths unquoted; non-UTF-8 names must not fail decoding
+        encoding="utf-8",
+        errors="surrogateescape",
+        timeout=10,
+    ).stdout
+    branch = "unknown"
+    # Header records ("# ...") come first; only those are split off here
+    pos = 0
+    while out.startswith("# ", pos):
+        end = out.find("\0", pos)
+        if end == -1:
+            end = len(out)
+        if out.startswith("# branch.head ", pos):
+            head = out[pos + len("# branch.head "):end]
+            branch = "detached HEAD" if head == "(detached)" else head
+        pos = end + 1
+    return branch, out[pos:]
+
+
+def _count_status_entries(entries: str) -> int:
+    """Number of changed paths in `git status --porcelain=v2 -z` entries."""
+    count = 0
+    records = iter(entries.split("\0"))
+    for record in records:
+        if record:
+            count += 1
+            if record.startswith("2 "):
+                next(records, None)  # a rename/copy's source path
+    return count
+
+
+@functools.lru_cache(maxsize=1)
+def _dangerous_dirs() -> frozenset[Path]:
+    """Directories never to run in, resolved once per process."""
     home = Path.home().resolve()
-    dangerous = {Path("/").resolve(), home}
+    root = Path("/").resolve()
+    dangerous = {root, home}
     # Block system directories
     for sys_dir in ["/var", "/etc", "/usr", "/System", "/Library", "/Applications"]:
         p = Path(sys_dir)
         if p.exists():
             dangerous.add(p.resolve())
     # Block parent directories of home (e.g. /Users)
-    for parent in home.parents:
-        if parent != Path("/").resolve():
-            dangerous.add(parent)
-    if project_dir in dangerous:
-        return f"Refusing to run in {project_dir} — too dangerous."
-
-    # Don't run inside the evaluator's own repo
-    if project_dir == SCRIPT_DIR or SCRIPT_DIR.is_relative_to(project_dir):
+    dangerous.update(parent for parent in home.parents if parent != root)
+    return frozenset(dangerous)
+
+
+def validate_project_dir(
+    project_dir: Path, *, skip_clean_check: bool = False,
+) -> tuple[str | None, str]:
+    """Check that the project dir is safe to run in.
+
+    Returns (error message or None, current branch name). The branch comes
+    from the same `git status` call as the clean check.
+    """
+    if project_dir in _dangerous_dirs():
+        return f"Refusing to run in {project_dir} — too dangerous.", "unknown"
+
+    # Don't run inside the evaluator's own repo: one commonpath covers both
+    # project_dir == SCRIPT_DIR and project_dir being an ancestor of it
+    if os.path.commonpath([project_dir, _SCRIPT_STR]) == str(project_dir):
         return (
             f"Project dir ({project_dir}) contains the evaluator itself. "
             "Use a different project."
-        )
+        ), "unknown"
 
     # Must be a git repo
     git_dir = project_dir / ".git"
     if not git_dir.is_dir():
-        return f"{project_dir} is not a git repository. Only git-tracked projects are supported."
-
-    # Working tree must be clean (no uncommitted changes)
-    if not skip_clean_check:
-        try:
-            status = subprocess.run(
-                ["git", "status", "--porcelain"],
-                cwd=str(project_dir),
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            return f"Could not run git status: {e}"
-
-        if status.stdout.strip():
-            dirty_count = len(status.stdout.strip().splitlines())
-            return (
-                f"Working tree has {dirty_count} uncommitted change(s). "
-                "Commit or stash them first so we can safely revert between runs.\n"
-                "  Hint: git stash  OR  git commit -am 'wip'"
-            )
+        return (
+            f"{project_dir} is not a git repository. Only git-tracked projects are supported."
+        ), "unknown"
 
-    return None
+    # Untracked files count as dirty: revert would delete them as files the
+    # agent created. Only the branch is needed when the check is skipped.
+    try:
+        branch, entries = _git_status(project_dir, untracked=not skip_clean_check)
+    except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+        if skip_clean_check:
+            return None, "unknown"
+        return f"Could not run git status: {e}", "unknown"
 
+    # Working tree must be clean (no uncommitted changes)
+    # Only counted when reported: a dirty tree in --eval mode skips the count
+    if not skip_clean_check and entries:
+        return (
+            f"Working tree has {_count_status_entries(entries)} uncommitted change(s). "
+            "Commit or stash them first so we can safely revert between runs.\n"
+            "  Hint: git stash  OR  git commit -am 'wip'"
+        ), branch
 
-def get_git_branch(project_dir: Path) -> str:
-    """Return the current branch name, or 'detached HEAD' / 'unknown'."""
-    try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            cwd=str(project_dir),
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        branch = result.stdout.strip()
-        return branch if branch else "unknown"
-    except Exception:
-        return "unknown"
+    return None, branch
 
 
 def get_multiline_input(prompt: str) -> str:
     """Read multi-line input terminated by a blank line or EOF."""
     print(prompt)
+    tty = sys.stdin.isatty()
     lines: list[str] = []
     while True:
-        try:
-            line = input("> ")
-        except EOFError:
-            break
+        if tty:
+            try:
+                line = input("> ")
+            except EOFError:
+                break
+        else:
+            # Piped/pasted input: plain readline, no per-line input() overhead
+            sys.stdout.write("> ")
+            sys.stdout.flush()
+            line = sys.stdin.readline()
+            if not line:
+                break
+            line = line.rstrip("\n")
         if line == "":
             break
         lines.append(line)
@@ -251,71 +352,141 @@ def get_multiline_input(prompt: str) -> str:
     return "\n".join(lines)
 
 
+_STATUS_SYMBOLS = {
+    "added": "+", "modified": "~", "deleted": "-",
+    "renamed": "R", "copied": "C", "type_changed": "T",
+}
+
+
 def show_file_changes(diffs: list[FileDiff]) -> None:
     """Print a summary of file changes."""
     if not diffs:
         print("\nNo files changed.")
         return
-    print("\nFiles changed:")
+    # Built up and written once rather than a print() per line
+    buf: list[str] = []
+    add = buf.append
+    add("\nFiles changed:")
     for d in diffs:
-        symbol = {"added": "+", "modified": "~", "deleted": "-", "renamed": "R", "copied": "C", "type_changed": "T"}.get(d.status, "?")
+        symbol = _STATUS_SYMBOLS.get(d.status, "?")
         suffix = f" (from {d.old_path})" if d.old_path else ""
-        print(f"  {symbol} {d.path} ({d.status}){suffix}")
+        add(f"  {symbol} {d.path} ({d.status}){suffix}")
+    sys.stdout.write("\n".join(buf) + "\n")
+
+
+@functools.lru_cache(maxsize=1)
+def _git_version() -> tuple[int, ...]:
+    """Installed git's (major, minor), or (0, 0) if it can't be determined."""
+    try:
+        out = subprocess.run(
+            ["git", "version"], capture_output=True, text=True, timeout=5,
+        ).stdout
+        # "git version 2.39.3 (Apple Git-146)"
+        return tuple(int(part) for part in out.split()[2].split(".")[:2])
+    except (OSError, subprocess.TimeoutExpired, IndexError, ValueError):
+        return (0, 0)
 
 
 def revert_changes(
     project_dir: Path, created_files: list[str], modified_files: list[str]
 ) -> None:
-    """Revert changes: delete created files, git-checkout modified files."""
+    """Revert changes: delete created files, git-restore modified files."""
+    lines: list[str] = []
+    dirs: set[Path] = set()
     for rel_path in created_files:
         fpath = project_dir / rel_path
-        if fpath.exists():
+        try:
             fpath.unlink()
-            print(f"  Deleted: {rel_path}")
-        # Remove empty parent dirs up to project_dir
+            lines.append(f"  Deleted: {rel_path}")
+        except FileNotFoundError:
+            pass
         parent = fpath.parent
-        while parent != project_dir:
-            try:
-                parent.rmdir()
-                print(f"  Removed empty dir: {parent.relative_to(project_dir)}")
-                parent = parent.parent
-            except OSError:
-                break
+        while parent != project_dir and parent not in dirs and parent.is_relative_to(project_dir):
+            dirs.add(parent)
+            parent = parent.parent
+
+    # Remove emptied dirs up to project_dir, deepest first so each is tried
+    # once, after everything below it
+    for parent in sorted(dirs, key=lambda p: len(p.parts), reverse=True):
+        try:
+            parent.rmdir()
+        except OSError:
+            continue
+        lines.append(f"  Removed empty dir: {parent.relative_to(project_dir)}")
+    if lines:
+        print("\n".join(lines))
 
     if modified_files:
+        if _git_version() >= (2, 25):
+            # Paths go NUL-separated on stdin: one git call, no argv limit
+            cmd = ["git", "--literal-pathspecs", "restore", "--worktree",
+                   "--pathspec-from-file=-", "--pathspec-file-nul"]
+            paths_input: str | None = "\0".join(modified_files)
+        else:
+            cmd = ["git", "--literal-pathspecs", "checkout", "--"] + modified_files
+            paths_input = None
         try:
             subprocess.run(
-                ["git", "checkout", "--"] + modified_files,
+                cmd,
+                input=paths_input,
                 cwd=str(project_dir),
                 capture_output=True,
                 text=True,
                 check=True,
+                timeout=30,
             )
-            for f in modified_files:
-                print(f"  Restored: {f}")
+            print("\n".join(f"  Restored: {f}" for f in modified_files))
         except subprocess.CalledProcessError as e:
-            print(f"  Warning: git checkout failed: {e.stderr.strip()}")
+            print(f"  Warning: git {cmd[2]} failed: {e.stderr.strip()}")
+        except subprocess.TimeoutExpired:
+            print(f"  Warning: git {cmd[2]} timed out after 30s")
+
+
+def _add_prompt(cmd: list[str], cfg: AgentConfig, prompt: str) -> str | None:
+    """Add a one-shot prompt to an agent command; return what to send on stdin.
+
+    With the standard -p flag the prompt goes through stdin, clear of argv
+    length limits. An overridden flag (e.g. --message) may expect the prompt
+    as its value, and a config that suppresses -p may not read stdin, so
+    those keep the prompt in argv and None is returned.
+    """
+    p_flag = resolve_flag(cfg, "-p")
+    if p_flag == "-p":
+        cmd.append(p_flag)
+        return prompt
+    if p_flag:
+        cmd.append(p_flag)
+    cmd.append(prompt)
+    return None
 
 
-def derive_expectations(
-    feedback: str, project_dir: str, task_prompt: str,
-    config: AgentConfig | None = None,
-) -> tuple[list[FileExpectation], list[CommandExpectation], list[DiffExpectation]]:
-    """Call Claude to convert freeform feedback into structured expectations."""
-    derivation_prompt = f"""You are converting user feedback about a coding task into structured JSON expectations.
+# Feedback that is nothing but "<build/test command> must pass". Anything
+# more (extra requirements, file names) still goes to the agent.
+_BUILD_ONLY_RE = re.compile(
+    r"\s*`?(?P<cmd>swift build|swift test|cargo build|cargo test|go build|go test"
+    r"|npm test|make|pytest)`?\s+(?:must|should)\s+(?:pass|succeed|work)[.!]?\s*",
+    re.IGNORECASE,
+)
 
-The task was run in project directory: {project_dir}
-The task prompt was:
-{task_prompt}
+# (feedback, project_dir, task_prompt) -> derived expectations. Frozen
+# expectations are safe to share; the lists are copied on the way out.
+# Holds the most recent _DERIVE_CACHE_MAX entries; older ones are still on disk.
+_DERIVE_CACHE: dict[
+    tuple[str, str, str],
+    tuple[list[FileExpectation], list[CommandExpectation], list[DiffExpectation]],
+] = {}
+_DERIVE_CACHE_MAX = 64
 
-The user's feedback on the result:
-{feedback}
+# Everything that doesn't vary per call, kept byte-identical across
+# derivations and sent ahead of the task details so repeated calls share a
+# cacheable prompt prefix.
+_DERIVATION_RULES = """You are converting user feedback about a coding task into structured JSON expectations.
 
-Convert this into a JSON object with three arrays:
+Convert the feedback into a JSON object with three arrays:
 
-{{
+{
   "file_expectations": [
-    {{
+    {
       "path": "relative/path/to/file.ext",
       "path_pattern": "",
       "should_exist": true,
@@ -325,10 +496,10 @@ Convert this into a JSON object with three arrays:
       "min_lines": null,
       "max_lines": null,
       "min_matching_files": null
-    }}
+    }
   ],
   "command_expectations": [
-    {{
+    {
       "command": ["swift", "build", "--build-tests"],
       "returncode": 0,
       "stdout_contains": [],
@@ -336,19 +507,19 @@ Convert this into a JSON object with three arrays:
       "stderr_contains": [],
       "stderr_not_contains": [],
       "timeout": 60
-    }}
+    }
   ],
   "diff_expectations": [
-    {{
+    {
       "allowed_statuses": ["added"],
       "allowed_path_patterns": ["Tests/**/*.swift"],
       "disallowed_path_patterns": [],
       "min_files_changed": null,
       "max_files_changed": null,
       "must_include_paths": []
-    }}
+    }
   ]
-}}
+}
 
 Rules:
 - Infer file paths from the task prompt and feedback context.
@@ -370,82 +541,245 @@ Rules:
 
 Return ONLY the raw JSON object. No markdown fences, no explanation."""
 
+
+# Agents started by _run_agent and still running. Each has its own process
+# group, out of reach of the terminal's Ctrl+C, so any still alive when the
+# tool exits (e.g. a background skill revision) are killed at exit.
+_LIVE_AGENTS: set[subprocess.Popen[str]] = set()
+_LIVE_AGENTS_LOCK = threading.Lock()
+
+
+def _kill_agent(proc: subprocess.Popen[str]) -> None:
+    """Kill an agent started by _run_agent, with everything it spawned."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass  # already gone
+
+
+def _kill_live_agents() -> None:
+    with _LIVE_AGENTS_LOCK:
+        procs = list(_LIVE_AGENTS)
+    for proc in procs:
+        _kill_agent(proc)
+
+
+atexit.register(_kill_live_agents)
+
+
+def _run_agent(
+    cmd: list[str], *, input: str | None, timeout: float, env: dict[str, str],
+) -> subprocess.CompletedProcess[str]:
+    """subprocess.run() for one-shot agent calls, killing the whole tree.
+
+    The agent runs in its own process group (session on POSIX) so a timeout
+    or Ctrl-C kills any children it spawned too; subprocess.run() only kills
+    the direct child, and a grandchild still holding the pipes would keep
+    communicate() waiting. Raises subprocess.TimeoutExpired like run().
+    While running it is listed in _LIVE_AGENTS, so exiting the tool (e.g. on
+    Ctrl+C in the main thread while this runs on another) kills it too.
+    """
+    if os.name == "posix":
+        group = {"start_new_session": True}
+    else:
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, env=env, **group,
+    )
+    with _LIVE_AGENTS_LOCK:
+        _LIVE_AGENTS.add(proc)
+    try:
+        with proc:
+            try:
+                stdout, stderr = proc.communicate(input, timeout=timeout)
+            except BaseException:
+                # Timeout or KeyboardInterrupt: the new group no longer gets
+                # the terminal's SIGINT, so take it down explicitly
+                _kill_agent(proc)
+                proc.communicate()
+                raise
+    finally:
+        with _LIVE_AGENTS_LOCK:
+            _LIVE_AGENTS.discard(proc)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+# The fields _DERIVATION_RULES documents, per expectation type. Anything else
+# in a derived entry is dropped.
+_FILE_EXP_FIELDS = frozenset((
+    "path", "path_pattern", "should_exist", "content_contains",
+    "content_not_contains", "content_matches", "min_lines", "max_lines",
+    "min_matching_files",
+))
+_CMD_EXP_FIELDS = frozenset((  # besides the required "command"
+    "returncode", "stdout_contains", "stdout_not_contains",
+    "stderr_contains", "stderr_not_contains", "timeout",
+))
+_DIFF_EXP_FIELDS = frozenset((
+    "allowed_statuses", "allowed_path_patterns", "disallowed_path_patterns",
+    "min_files_changed", "max_files_changed", "must_include_paths",
+))
+
+
+def _expectations_from_data(
+    data: dict[str, Any],
+) -> tuple[list[FileExpectation], list[CommandExpectation], list[DiffExpectation]]:
+    """Build expectation objects from a parsed derivation response.
+
+    Missing keys take the dataclass defaults, except a command entry's
+    "command", whose absence raises KeyError.
+    """
+    file_exps = [
+        FileExpectation(**{k: v for k, v in fe.items() if k in _FILE_EXP_FIELDS})
+        for fe in data.get("file_expectations", ())
+    ]
+    cmd_exps = [
+        CommandExpectation(
+            command=ce["command"],
+            **{k: v for k, v in ce.items() if k in _CMD_EXP_FIELDS},
+        )
+        for ce in data.get("command_expectations", ())
+    ]
+    diff_exps = [
+        DiffExpectation(**{k: v for k, v in de.items() if k in _DIFF_EXP_FIELDS})
+        for de in data.get("diff_expectations", ())
+    ]
+    return file_exps, cmd_exps, diff_exps
+
+
+def _derive_cache_path(feedback: str, project_dir: str, task_prompt: str) -> Path:
+    """On-disk cache file for a derivation, addressed by a hash of its inputs."""
+    key = json.dumps([_DERIVATION_RULES, project_dir, task_prompt, feedback])
+    return DERIVE_CACHE_DIR / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+
+def _read_derive_cache(path: Path) -> dict[str, Any] | None:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _write_derive_cache(path: Path, data: dict[str, Any]) -> None:
+    """Store a derivation atomically; a failed write only costs a cache miss."""
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False,
+        ) as f:
+            tmp = f.name
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp:
+            Path(tmp).unlink(missing_ok=True)
+
+
+def _remember_derivation(
+    key: tuple[str, str, str],
+    result: tuple[list[FileExpectation], list[CommandExpectation], list[DiffExpectation]],
+) -> None:
+    """Add to the in-memory cache, dropping the oldest entry once it is full."""
+    if len(_DERIVE_CACHE) >= _DERIVE_CACHE_MAX and key not in _DERIVE_CACHE:
+        del _DERIVE_CACHE[next(iter(_DERIVE_CACHE))]
+    _DERIVE_CACHE[key] = result
+
+
+def _forget_derivation(feedback: str, project_dir: str, task_prompt: str) -> None:
+    """Drop a derivation from both caches so it is asked for afresh."""
+    _DERIVE_CACHE.pop((feedback, project_dir, task_prompt), None)
+    try:
+        _derive_cache_path(feedback, project_dir, task_prompt).unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def derive_expectations(
+    feedback: str, project_dir: str, task_prompt: str,
+    config: AgentConfig | None = None,
+) -> tuple[list[FileExpectation], list[CommandExpectation], list[DiffExpectation]]:
+    """Call Claude to convert freeform feedback into structured expectations.
+
+    Results are cached per (feedback, project dir, task prompt), in memory
+    for the session and on disk under DERIVE_CACHE_DIR, so repeating the same
+    feedback doesn't repeat the agent call.
+    Feedback that only asks for a build/test command to pass is turned into
+    that command check directly.
+    """
+    cache_key = (feedback, project_dir, task_prompt)
+    cached = _DERIVE_CACHE.get(cache_key)
+    if cached is not None:
+        return [*cached[0]], [*cached[1]], [*cached[2]]
+
+    disk_path = _derive_cache_path(feedback, project_dir, task_prompt)
+    stored = _read_derive_cache(disk_path)
+    if stored is not None:
+        try:
+            result = _expectations_from_data(stored)
+        except (KeyError, TypeError, AttributeError):
+            result = None  # stale or hand-edited entry; derive again
+        if result is not None and any(result):
+            _remember_derivation(cache_key, result)
+            return [*result[0]], [*result[1]], [*result[2]]
+
+    # "<build command> must pass" on its own needs no agent call
+    build_only = _BUILD_ONLY_RE.fullmatch(feedback)
+    if build_only:
+        command = build_only.group("cmd").lower().split()
+        return [], [CommandExpectation(command=command, timeout=120)], []
+
+    derivation_prompt = f"""The task was run in project directory: {project_dir}
+The task prompt was:
+{task_prompt}
+
+The user's feedback on the result:
+{feedback}"""
+
     try:
         cfg = config or AgentConfig()
         cmd = list(build_base_command(cfg))
-        p_flag = resolve_flag(cfg, "-p")
-        if p_flag:
-            cmd.extend([p_flag, derivation_prompt])
+        system_flag = resolve_flag(cfg, "--system-prompt")
+        if system_flag:
+            cmd.extend([system_flag, _DERIVATION_RULES])
         else:
-            cmd.append(derivation_prompt)
-
-        proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60,
-            env=build_env(cfg),
-        )
+            derivation_prompt = f"{_DERIVATION_RULES}\n\n{derivation_prompt}"
+        format_flag = resolve_flag(cfg, "--output-format")
+        if format_flag:
+            cmd.extend([format_flag, "json"])
+        prompt_input = _add_prompt(cmd, cfg, derivation_prompt)
 
-        text = proc.stdout.strip()
-
-        # Strip markdown fences if Claude wrapped them
-        if text.startswith("```"):
-            lines = text.split("\n")
-            lines = [l for l in lines if not l.startswith("```")]
-            text = "\n".join(lines)
-
-        data = json.loads(text)
-
-        file_exps: list[FileExpectation] = []
-        for fe in data.get("file_expectations", []):
-            file_exps.append(
-                FileExpectation(
-                    path=fe.get("path", ""),
-                    path_pattern=fe.get("path_pattern", ""),
-                    should_exist=fe.get("should_exist", True),
-                    content_contains=fe.get("content_contains", []),
-                    content_matches=fe.get("content_matches", []),
-                    content_not_contains=fe.get("content_not_contains", []),
-                    min_lines=fe.get("min_lines"),
-                    max_lines=fe.get("max_lines"),
-                    min_matching_files=fe.get("min_matching_files"),
-                )
-            )
+        proc = _run_agent(cmd, input=prompt_input, timeout=60, env=build_env(cfg))
 
-        cmd_exps: list[CommandExpectation] = []
-        for ce in data.get("command_expectations", []):
-            cmd_exps.append(
-                CommandExpectation(
-                    command=ce["command"],
-                    returncode=ce.get("returncode", 0),
-                    stdout_contains=ce.get("stdout_contains", []),
-                    stdout_not_contains=ce.get("stdout_not_contains", []),
-                    stderr_contains=ce.get("stderr_contains", []),
-                    stderr_not_contains=ce.get("stderr_not_contains", []),
-                    timeout=ce.get("timeout", 30),
-                )
-            )
+        text = proc.stdout
+        if format_flag:
+            # Envelope: {"type": "result", "result": "<model text>", ...}
+            text = json.loads(text)["result"]
 
-        diff_exps: list[DiffExpectation] = []
-        for de in data.get("diff_expectations", []):
-            diff_exps.append(
-                DiffExpectation(
-                    allowed_statuses=de.get("allowed_statuses", []),
-                    allowed_path_patterns=de.get("allowed_path_patterns", []),
-                    disallowed_path_patterns=de.get("disallowed_path_patterns", []),
-                    min_files_changed=de.get("min_files_changed"),
-                    max_files_changed=de.get("max_files_changed"),
-                    must_include_paths=de.get("must_include_paths", []),
-                )
-            )
+        # Drop markdown fences or chatter around the object
+        start, end = text.find("{"), text.rfind("}")
+        data = json.loads(text[start:end + 1] if start != -1 else text)
 
+        file_exps, cmd_exps, diff_exps = _expectations_from_data(data)
+
+        if file_exps or cmd_exps or diff_exps:
+            _remember_derivation(cache_key, (file_exps, cmd_exps, diff_exps))
+            _write_derive_cache(disk_path, data)
         return file_exps, cmd_exps, diff_exps
 
     except subprocess.TimeoutExpired:
         print(f"\nError: derivation call timed out after 60s (prompt was {len(derivation_prompt)} chars).")
         return [], [], []
-    except (json.JSONDecodeError, KeyError) as e:
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        # AttributeError: a non-string "result", or JSON that isn't an
+        # object (or a list of objects) where one is expected
         print(f"\nError parsing derived expectations: {e}")
         try:
             raw = proc.stdout.strip()  # type: ignore[possibly-undefined]
@@ -462,49 +796,53 @@ def show_expectations(
     diff_exps: list[DiffExpectation] | None = None,
 ) -> None:
     """Display derived expectations for user review."""
-    print("\nDerived expectations:")
+    # Built up and written once rather than a print() per line
+    buf: list[str] = []
+    add = buf.append
+    add("\nDerived expectations:")
     for fe in file_exps:
         if fe.path_pattern:
             min_f = fe.min_matching_files if fe.min_matching_files is not None else 1
-            print(f"  [+] File pattern: {fe.path_pattern} (>= {min_f} match(es))")
+            add(f"  [+] File pattern: {fe.path_pattern} (>= {min_f} match(es))")
         else:
             exist_str = "exists" if fe.should_exist else "does not exist"
-            print(f"  [+] File: {fe.path} {exist_str}")
+            add(f"  [+] File: {fe.path} {exist_str}")
         if fe.content_contains:
-            print(f"      Contains: {', '.join(fe.content_contains)}")
+            add(f"      Contains: {', '.join(fe.content_contains)}")
         if fe.content_not_contains:
-            print(f"      Not contains: {', '.join(fe.content_not_contains)}")
+            add(f"      Not contains: {', '.join(fe.content_not_contains)}")
         if fe.content_matches:
-            print(f"      Matches: {', '.join(fe.content_matches)}")
+            add(f"      Matches: {', '.join(fe.content_matches)}")
         if fe.min_lines is not None:
-            print(f"      Min lines: {fe.min_lines}")
+            add(f"      Min lines: {fe.min_lines}")
         if fe.max_lines is not None:
-            print(f"      Max lines: {fe.max_lines}")
+            add(f"      Max lines: {fe.max_lines}")
     for ce in cmd_exps:
         cmd_str = " ".join(ce.command)
-        print(f"  [+] Command: {cmd_str} returns {ce.returncode}")
+        add(f"  [+] Command: {cmd_str} returns {ce.returncode}")
         if ce.stdout_contains:
-            print(f"      Stdout contains: {', '.join(ce.stdout_contains)}")
+            add(f"      Stdout contains: {', '.join(ce.stdout_contains)}")
         if ce.stdout_not_contains:
-            print(f"      Stdout excludes: {', '.join(ce.stdout_not_contains)}")
+            add(f"      Stdout excludes: {', '.join(ce.stdout_not_contains)}")
         if ce.stderr_contains:
-            print(f"      Stderr contains: {', '.join(ce.stderr_contains)}")
+            add(f"      Stderr contains: {', '.join(ce.stderr_contains)}")
         if ce.stderr_not_contains:
-            print(f"      Stderr excludes: {', '.join(ce.stderr_not_contains)}")
+            add(f"      Stderr excludes: {', '.join(ce.stderr_not_contains)}")
     for de in (diff_exps or []):
-        print(f"  [+] Diff constraint:")
+        add(f"  [+] Diff constraint:")
         if de.allowed_statuses:
-            print(f"      Allowed statuses: {', '.join(de.allowed_statuses)}")
+            add(f"      Allowed statuses: {', '.join(de.allowed_statuses)}")
         if de.allowed_path_patterns:
-            print(f"      Allowed paths: {', '.join(de.allowed_path_patterns)}")
+            add(f"      Allowed paths: {', '.join(de.allowed_path_patterns)}")
         if de.disallowed_path_patterns:
-            print(f"      Disallowed paths: {', '.join(de.disallowed_path_patterns)}")
+            add(f"      Disallowed paths: {', '.join(de.disallowed_path_patterns)}")
         if de.min_files_changed is not None:
-            print(f"      Min files changed: {de.min_files_changed}")
+            add(f"      Min files changed: {de.min_files_changed}")
         if de.max_files_changed is not None:
-            print(f"      Max files changed: {de.max_files_changed}")
+            add(f"      Max files changed: {de.max_files_changed}")
         if de.must_include_paths:
-            print(f"      Must include: {', '.join(de.must_include_paths)}")
+            add(f"      Must include: {', '.join(de.must_include_paths)}")
+    sys.stdout.write("\n".join(buf) + "\n")
 
 
 def _edit_expectations(
@@ -597,6 +935,8 @@ def collect_and_derive_expectations(
             return file_exps, cmd_exps, diff_exps
         elif choice in ("r", "reject"):
             print("Expectations rejected.")
+            # Let the same feedback get a fresh derivation next time
+            _forget_derivation(feedback, str(project_dir), task_prompt)
             return [], [], []
         elif choice in ("e", "edit"):
             file_exps, cmd_exps, diff_exps = _edit_expectations(file_exps, cmd_exps, diff_exps)
@@ -609,6 +949,28 @@ def collect_and_derive_expectations(
             print("Please enter 'a', 'e', or 'r'.")
 
 
+def _in_background(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> Future[_T]:
+    """Start fn(*args, **kwargs) on a daemon thread and return its Future.
+
+    Unlike an executor's worker, the thread isn't joined at exit, so Ctrl+C
+    doesn't wait on an agent call nobody will read.
+    """
+    future: Future[_T] = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+# A reply wrapped in a single markdown fence, e.g. ```markdown ... ```
+_FENCED_REPLY_RE = re.compile(r"```[\w-]*\n(.*?)\n?```", re.DOTALL)
+
+
 def derive_skill_update(
     current_skill: str,
     feedback: str,
@@ -616,7 +978,11 @@ def derive_skill_update(
     checks: list[CheckResult] | None = None,
     config: AgentConfig | None = None,
 ) -> str | None:
-    """Call Claude to propose a revised skill based on feedback and evaluation results."""
+    """Call Claude to propose a revised skill based on feedback and evaluation results.
+
+    Returns None if nothing changed. Agent failures (timeout, missing
+    command) are raised; _await_skill_update reports them.
+    """
     eval_context = ""
     if checks:
         results = []
@@ -651,45 +1017,42 @@ Revise the skill to address the feedback. Guidelines:
 
 Return ONLY the complete revised skill text. No explanation, no markdown fences, no preamble."""
 
-    try:
-        cfg = config or AgentConfig()
-        cmd = list(build_base_command(cfg))
-        p_flag = resolve_flag(cfg, "-p")
-        if p_flag:
-            cmd.extend([p_flag, revision_prompt])
-        else:
-            cmd.append(revision_prompt)
-
-        proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=90,
-            env=build_env(cfg),
-        )
+    cfg = config or AgentConfig()
+    cmd = list(build_base_command(cfg))
+    prompt_input = _add_prompt(cmd, cfg, revision_prompt)
+
+    proc = _run_agent(cmd, input=prompt_input, timeout=90, env=build_env(cfg))
+
+    revised = proc.stdout.strip()
+    if not revised:
+        return None
+
+    # Unwrap the reply if Claude fenced the whole skill; fences inside
+    # the skill itself are content and stay
+    fenced = _FENCED_REPLY_RE.fullmatch(revised)
+    if fenced:
+        revised = fenced.group(1)
 
-        revised = proc.stdout.strip()
-        if not revised:
-            return None
+    # If unchanged, return None
+    if revised.strip() == current_skill.strip():
+        return None
 
-        # Strip markdown fences if Claude wrapped them
-        if revised.startswith("```"):
-            lines = revised.split("\n")
-            lines = [l for l in lines if not l.startswith("```")]
-            revised = "\n".join(lines)
+    return revised
 
-        # If unchanged, return None
-        if revised.strip() == current_skill.strip():
-            return None
 
-        return revised
+def _await_skill_update(skill_update: Future[str | None]) -> str | None:
+    """Wait for a background derive_skill_update and report its errors.
 
+    Errors are printed here, on the main thread once the expectation review
+    is over, rather than from the background thread mid-prompt.
+    """
+    try:
+        return skill_update.result()
     except subprocess.TimeoutExpired:
         print("\nError: skill revision call timed out.")
-        return None
     except Exception as e:
         print(f"\nError during skill revision: {e}")
-        return None
+    return None
 
 
 def show_skill_diff(old_skill: str, new_skill: str) -> None:
@@ -723,13 +1086,20 @@ def run_evaluation(
     diff_exps: list[DiffExpectation] | None = None,
     file_diffs: list[FileDiff] | None = None,
     config: AgentConfig | None = None,
+    gym: ClaudeGym | None = None,
 ) -> list[CheckResult]:
-    """Run expectation checks against the current project state."""
-    gym = ClaudeGym(work_dir=project_dir, agent_config=config)
+    """Run expectation checks against the current project state.
+
+    gym, if given, must be working in project_dir; otherwise one is made.
+    """
+    if gym is None:
+        gym = ClaudeGym(work_dir=project_dir, agent_config=config)
     evaluator = ClaudeEvaluator(agent_config=config)
     checks: list[CheckResult] = []
-    checks.extend(evaluator._verify_file_expectations(gym, file_exps))
-    checks.extend(evaluator._verify_command_expectations(gym, cmd_exps))
+    # File checks must finish before any command can change the files
+    file_checks = evaluator._verify_file_expectations(gym, file_exps)
+    checks.extend(file_checks)
+    checks.extend(evaluator._verify_commands_after_files(gym, file_exps, file_checks, cmd_exps))
     if diff_exps and file_diffs is not None:
         checks.extend(evaluator._verify_diff_expectations(file_diffs, diff_exps))
     return checks
@@ -737,18 +1107,22 @@ def run_evaluation(
 
 def print_evaluation(checks: list[CheckResult]) -> None:
     """Print pass/fail report."""
-    print("\nEvaluation:")
+    # Built up and written once rather than a print() per line
+    buf: list[str] = []
+    add = buf.append
+    add("\nEvaluation:")
     passed = 0
     for check in checks:
         icon = "+" if check.passed else "-"
-        print(f"  [{icon}] {check.message}")
+        add(f"  [{icon}] {check.message}")
         if check.details and not check.passed:
             for line in check.details.splitlines()[:3]:
-                print(f"      {line}")
+                add(f"      {line}")
         if check.passed:
             passed += 1
     total = len(checks)
-    print(f"\nResults: {passed}/{total} checks passed")
+    add(f"\nResults: {passed}/{total} checks passed")
+    sys.stdout.write("\n".join(buf) + "\n")
 
 
 def main() -> int:
@@ -794,7 +1168,7 @@ def main() -> int:
             diff_exps = [DiffExpectation(**de) for de in saved.get("diff_expectations", [])]
             run_number = saved.get("run_number", 0)
 
-            dir_err = validate_project_dir(project_dir, skip_clean_check=True)
+            dir_err, branch = validate_project_dir(project_dir, skip_clean_check=True)
             if dir_err:
                 print(f"Error: {dir_err}")
                 delete_session()
@@ -803,7 +1177,6 @@ def main() -> int:
             interactive_input = input("\nInteractive mode? (y/n) [n]: ").strip().lower()
             interactive = interactive_input == "y"
 
-            branch = get_git_branch(project_dir)
             print(f"\nProject: {project_dir}")
             print(f"Branch:  {branch}")
 
@@ -865,7 +1238,7 @@ def main() -> int:
             else:
                 print(f"Error: {project_dir} is not a directory.\n")
             continue
-        dir_err = validate_project_dir(project_dir, skip_clean_check=args.eval)
+        dir_err, branch = validate_project_dir(project_dir, skip_clean_check=args.eval)
         if dir_err:
             print(f"Error: {dir_err}\n")
             continue
@@ -879,7 +1252,6 @@ def main() -> int:
     else:
         print("Claude will run headless (non-interactive).")
 
-    branch = get_git_branch(project_dir)
     print(f"\nProject: {project_dir}")
     print(f"Branch:  {branch}")
 
@@ -902,15 +1274,16 @@ def main() -> int:
             feedback = get_multiline_input("\nFeedback (or 'done'):")
 
         if feedback.strip().lower() != "done" and feedback.strip():
+            skill_update = _in_background(
+                derive_skill_update, skill, feedback, task_prompt, config=config,
+            )
             file_exps, cmd_exps, diff_exps = collect_and_derive_expectations(
                 feedback, project_dir, task_prompt, config=config,
             )
 
             # Propose skill update based on feedback
             print("\n[Proposing skill update...]")
-            revised_skill = derive_skill_update(
-                skill, feedback, task_prompt, config=config,
-            )
+            revised_skill = _await_skill_update(skill_update)
             if revised_skill:
                 print("\nProposed skill changes:")
                 show_skill_diff(skill, revised_skill)
@@ -950,6 +1323,14 @@ def _run_loop(
     args: argparse.Namespace,
 ) -> int:
     """Main iteration loop. Extracted so both normal and resume paths can use it."""
+    # One gym for every run; reset() below starts each run's session afresh
+    gym = ClaudeGym(
+        work_dir=project_dir,
+        system_prompt=skill,
+        debug_mode=not interactive,
+        interactive=interactive,
+        agent_config=config,
+    )
     while True:
         run_number += 1
         has_expectations = bool(file_exps or cmd_exps or diff_exps)
@@ -982,14 +1363,9 @@ def _run_loop(
             file_exps, cmd_exps, diff_exps, run_number,
         )
 
-        # Run Claude in the real project
-        gym = ClaudeGym(
-            work_dir=project_dir,
-            system_prompt=skill,
-            debug_mode=not interactive,
-            interactive=interactive,
-            agent_config=config,
-        )
+        # Run Claude in the real project, with the skill as last revised
+        gym.reset()
+        gym.system_prompt = skill
         turn = gym.send_prompt(task_prompt)
 
         # Track changes for revert on next iteration
@@ -1016,7 +1392,7 @@ def _run_loop(
             checks = run_evaluation(
                 project_dir, file_exps, cmd_exps,
                 diff_exps=diff_exps, file_diffs=turn.file_diffs,
-                config=config,
+                config=config, gym=gym,
             )
             print_evaluation(checks)
 
@@ -1036,6 +1412,12 @@ def _run_loop(
             print("No feedback provided, running again with current settings...")
             continue
 
+        # The skill revision doesn't depend on the derived expectations:
+        # start its agent call now so it overlaps derivation and review
+        skill_update = _in_background(
+            derive_skill_update, skill, feedback, task_prompt, checks or None, config=config,
+        )
+
         # Derive expectations from feedback
         new_file_exps, new_cmd_exps, new_diff_exps = collect_and_derive_expectations(
             feedback, project_dir, task_prompt, config=config,
@@ -1050,9 +1432,7 @@ def _run_loop(
 
         # Propose skill update based on feedback
         print("\n[Proposing skill update...]")
-        revised_skill = derive_skill_update(
-            skill, feedback, task_prompt, checks or None, config=config,
-        )
+        revised_skill = _await_skill_update(skill_update)
         if revised_skill:
             print("\nProposed skill changes:")
             show_skill_diff(skill, revised_skill)
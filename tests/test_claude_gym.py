@@ -1,12 +1,15 @@
 """Tests for claude_gym.py — diff parsing, git diffing, command building."""
 
+import io
 import os
 import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
-from claude_gym import ClaudeGym, FileDiff
+from claude_gym import ClaudeGym, FileDiff, TurnResult
 from config import AgentConfig
 
 
@@ -60,6 +63,22 @@ class TestParseGitDiffOutput(unittest.TestCase):
         chunks = self.gym._parse_git_diff_output("")
         self.assertEqual(len(chunks), 0)
 
+    def test_chunk_text_preserved(self):
+        diff_text = (
+            "preamble\n"
+            "diff --git a/a.py b/a.py\n"
+            "@@ -1 +1 @@\n"
+            "-x\n"
+            "+y\n"
+            "diff --git a/b.py b/b.py\n"
+            "+z\n"
+        )
+        chunks = self.gym._parse_git_diff_output(diff_text)
+        self.assertEqual(chunks, [
+            ("a.py", "diff --git a/a.py b/a.py\n@@ -1 +1 @@\n-x\n+y"),
+            ("b.py", "diff --git a/b.py b/b.py\n+z"),
+        ])
+
     def test_path_with_spaces(self):
         diff_text = (
             "diff --git a/my file.py b/my file.py\n"
@@ -133,6 +152,42 @@ class TestGitComputeDiffs(unittest.TestCase):
         untracked_diff = next(d for d in diffs if d.path == "untracked.py")
         self.assertEqual(untracked_diff.status, "added")
 
+    def test_many_untracked_files(self):
+        baseline = self._get_head()
+        for name in ("c.py", "a.py", "b.py"):
+            (Path(self.tmpdir) / name).write_text(f"# {name}\n")
+        diffs = self.gym._git_compute_diffs(baseline)
+        self.assertEqual([d.path for d in diffs], ["a.py", "b.py", "c.py"])
+        for d in diffs:
+            self.assertIn(f"+# {d.path}", d.unified_diff)
+
+    def test_untracked_non_ascii_path(self):
+        baseline = self._get_head()
+        (Path(self.tmpdir) / "café.py").write_text("x = 1\n")
+        diffs = self.gym._git_compute_diffs(baseline)
+        self.assertEqual([d.path for d in diffs], ["café.py"])
+        self.assertIn("+x = 1", diffs[0].unified_diff)
+        self.assertEqual(self.gym.list_files(), ["café.py"])
+
+    def test_oversized_untracked_file_not_diffed(self):
+        baseline = self._get_head()
+        (Path(self.tmpdir) / "huge.txt").write_text("x" * 64 + "\n")
+        with patch("claude_gym.MAX_DIFF_SIZE", 32):
+            diffs = self.gym._git_compute_diffs(baseline)
+        self.assertEqual(diffs[0].path, "huge.txt")
+        self.assertEqual(diffs[0].status, "added")
+        self.assertEqual(diffs[0].unified_diff, "")
+
+    def test_touched_but_unchanged_file(self):
+        (Path(self.tmpdir) / "same.py").write_text("same\n")
+        self.run("git", "add", "same.py")
+        self.run("git", "commit", "-q", "-m", "add same")
+        baseline = self._get_head()
+        os.utime(Path(self.tmpdir) / "same.py", (0, 0))
+        self.assertEqual(self.gym._git_compute_diffs(baseline), [])
+        # A second pass reuses the refreshed stat info and agrees
+        self.assertEqual(self.gym._git_compute_diffs(baseline), [])
+
     def test_renamed_file(self):
         (Path(self.tmpdir) / "old_name.py").write_text("content here\n")
         self.run("git", "add", "old_name.py")
@@ -145,6 +200,16 @@ class TestGitComputeDiffs(unittest.TestCase):
         self.assertEqual(renamed.status, "renamed")
         self.assertEqual(renamed.old_path, "old_name.py")
 
+    def test_read_capped_truncates(self):
+        (Path(self.tmpdir) / "big.txt").write_text("x" * 1000 + "\n")
+        self.run("git", "add", "big.txt")
+        text, truncated = self.gym._git_read_capped(["git", "diff", "--cached"], 100)
+        self.assertTrue(truncated)
+        self.assertEqual(len(text), 100)
+        text, truncated = self.gym._git_read_capped(["git", "diff", "--cached"], 10_000)
+        self.assertFalse(truncated)
+        self.assertIn("+" + "x" * 1000, text)
+
 
 class TestBuildCommand(unittest.TestCase):
     """Test _build_command output."""
@@ -172,6 +237,17 @@ class TestBuildCommand(unittest.TestCase):
         self.assertIn("--model", cmd)
         self.assertIn("opus", cmd)
 
+    def test_config_edited_in_place_rebuilds_command(self):
+        config = AgentConfig()
+        gym = ClaudeGym(work_dir=self.tmpdir, agent_config=config)
+        self.assertEqual(gym._build_command("test")[0], "claude")
+        config.command = "wrapper"
+        config.extra_args.append("--x")
+        config.flag_overrides["--verbose"] = None
+        cmd = gym._build_command("test")
+        self.assertEqual(cmd[:2], ["wrapper", "--x"])
+        self.assertNotIn("--verbose", cmd)
+
     def test_flag_overrides(self):
         config = AgentConfig(flag_overrides={"-p": "--prompt"})
         gym = ClaudeGym(work_dir=self.tmpdir, agent_config=config)
@@ -193,6 +269,269 @@ class TestBuildCommand(unittest.TestCase):
         self.assertNotIn("--output-format", cmd)
         self.assertEqual(cmd[-1], "test prompt")
 
+    def test_resume_spliced_per_turn(self):
+        gym = ClaudeGym(work_dir=self.tmpdir, model="opus")
+        first = gym._build_command("one")
+        second = gym._build_command("two", resume_session="sess-1")
+        self.assertNotIn("--resume", first)
+        self.assertEqual(second[second.index("--resume") + 1], "sess-1")
+        self.assertEqual(second[second.index("-p") + 1], "two")
+        self.assertIn("opus", second)
+
+    def test_settings_change_rebuilds_flags(self):
+        gym = ClaudeGym(work_dir=self.tmpdir, system_prompt="v1")
+        self.assertIn("v1", gym._build_command("test"))
+        gym.system_prompt = "v2"
+        cmd = gym._build_command("test")
+        self.assertIn("v2", cmd)
+        self.assertNotIn("v1", cmd)
+
+
+class TestParseStreamEvents(unittest.TestCase):
+    """Test _parse_stream_events against a real child process."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _spawn(self, script):
+        return subprocess.Popen(
+            [sys.executable, "-c", script],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def test_events_and_result(self):
+        seen = []
+        gym = ClaudeGym(work_dir=self.tmpdir, stream_callback=seen.append)
+        process = self._spawn(
+            "import json\n"
+            "print(json.dumps({'type': 'content_block_start', 'content_block':"
+            " {'type': 'tool_use', 'name': 'Edit', 'id': 't1'}}))\n"
+            "print('not json')\n"
+            "print('[1, 2]')\n"
+            "print('{truncated')\n"
+            "print()\n"
+            "print(json.dumps({'type': 'result', 'result': 'done'}))\n"
+        )
+        raw_jsonl, result_event, tool_uses, skipped = gym._parse_stream_events(process)
+        process.wait()
+        process.stdout.close()
+        self.assertEqual([e["type"] for e in seen], ["content_block_start", "result"])
+        self.assertEqual(tool_uses, [{"name": "Edit", "id": "t1"}])
+        self.assertEqual(result_event["result"], "done")
+        self.assertEqual(skipped, 3)
+        self.assertEqual(len(raw_jsonl.splitlines()), 2)
+
+    def test_raw_events_dropped_without_consumer(self):
+        gym = ClaudeGym(work_dir=self.tmpdir)
+        process = self._spawn(
+            "import json\n"
+            "print(json.dumps({'type': 'result', 'result': 'done'}))\n"
+        )
+        raw_jsonl, result_event, _, _ = gym._parse_stream_events(process)
+        process.wait()
+        process.stdout.close()
+        self.assertEqual(raw_jsonl, b"")
+        self.assertEqual(result_event["result"], "done")
+
+    def test_retain_events_overrides_default(self):
+        script = (
+            "import json\n"
+            "print(json.dumps({'type': 'result', 'result': 'done'}))\n"
+        )
+        kept = ClaudeGym(work_dir=self.tmpdir, retain_events=True)
+        dropped = ClaudeGym(
+            work_dir=self.tmpdir, stream_callback=lambda e: None, retain_events=False,
+        )
+        for gym, expected in ((kept, 1), (dropped, 0)):
+            process = self._spawn(script)
+            raw_jsonl, _, _, _ = gym._parse_stream_events(process)
+            process.wait()
+            process.stdout.close()
+            self.assertEqual(len(raw_jsonl.splitlines()), expected)
+
+
+class TestDebugPrintEvent(unittest.TestCase):
+    """Test _debug_print_event dispatch."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.gym = ClaudeGym(work_dir=self.tmpdir, debug_mode=True)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _printed(self, event):
+        with patch("sys.stderr", new_callable=io.StringIO) as err:
+            self.gym._debug_print_event(event)
+        return err.getvalue()
+
+    def test_text_delta(self):
+        out = self._printed({
+            "type": "content_block_delta",
+            "delta": {"type": "text_delta", "text": "hello"},
+        })
+        self.assertEqual(out, "hello")
+
+    def test_tool_use_start(self):
+        out = self._printed({
+            "type": "content_block_start",
+            "content_block": {"type": "tool_use", "name": "Bash"},
+        })
+        self.assertIn("[TOOL: Bash]", out)
+
+    def test_result(self):
+        out = self._printed({"type": "result", "cost_usd": 0.5, "num_turns": 2})
+        self.assertIn("2 turn(s), $0.5000", out)
+
+    def test_unknown_type_ignored(self):
+        self.assertEqual(self._printed({"type": "ping"}), "")
+
+
+class TestTurnResult(unittest.TestCase):
+    """Test lazy decoding of raw stream events."""
+
+    def test_raw_events_parsed_on_demand(self):
+        turn = TurnResult(
+            prompt="p", result_text="", session_id=None, num_turns=0,
+            cost_usd=0.0, duration=0.0, is_error=False,
+            raw_events_jsonl=b'{"type": "a"}\n{"type": "result"}',
+            tool_uses=[], file_diffs=[],
+        )
+        self.assertEqual(turn.raw_events, [{"type": "a"}, {"type": "result"}])
+
+    def test_empty_raw_events(self):
+        turn = TurnResult(
+            prompt="p", result_text="", session_id=None, num_turns=0,
+            cost_usd=0.0, duration=0.0, is_error=False,
+            raw_events_jsonl=b"", tool_uses=[], file_diffs=[],
+        )
+        self.assertEqual(turn.raw_events, [])
+
+
+class TestGetFileContent(unittest.TestCase):
+    """Test get_file_content decoding rules."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.gym = ClaudeGym(work_dir=self.tmpdir)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_text_file(self):
+        (Path(self.tmpdir) / "a.txt").write_bytes(b"one\r\ntwo\n")
+        self.assertEqual(self.gym.get_file_content("a.txt"), "one\ntwo\n")
+
+    def test_binary_file(self):
+        (Path(self.tmpdir) / "a.bin").write_bytes(b"\x89PNG\0\0data")
+        self.assertIsNone(self.gym.get_file_content("a.bin"))
+
+    def test_missing_file(self):
+        self.assertIsNone(self.gym.get_file_content("nope.txt"))
+
+    def test_count_lines_matches_content(self):
+        cases = [b"", b"a", b"a\n", b"a\r\nb", b"a\rb\r", b"\r\n\r\n", b"x\r\r\ny", "é\nü".encode(),
+                 "a\x0cb\x85c\u2028d\u2029".encode(), b"a\x0b\x1c\x1d\x1eb"]
+        # Tiny reads so "\r\n" pairs and multi-byte characters straddle blocks
+        with patch("claude_gym.READ_CHUNK_SIZE", 1):
+            for raw in cases:
+                (Path(self.tmpdir) / "f.txt").write_bytes(raw)
+                expected = len(self.gym.get_file_content("f.txt").splitlines())
+                self.assertEqual(self.gym.count_lines("f.txt"), expected, repr(raw))
+
+    def test_count_lines_unreadable(self):
+        (Path(self.tmpdir) / "a.bin").write_bytes(b"\x89PNG\0\0data")
+        (Path(self.tmpdir) / "latin1.txt").write_bytes(b"caf\xe9\n")
+        self.assertIsNone(self.gym.count_lines("a.bin"))
+        self.assertIsNone(self.gym.count_lines("latin1.txt"))
+        self.assertIsNone(self.gym.count_lines("nope.txt"))
+
+
+    def test_file_exists(self):
+        (Path(self.tmpdir) / "a.bin").write_bytes(b"\x89PNG\0\0data")
+        (Path(self.tmpdir) / "sub").mkdir()
+        self.assertTrue(self.gym.file_exists("a.bin"))
+        self.assertFalse(self.gym.file_exists("sub"))
+        self.assertFalse(self.gym.file_exists("nope.txt"))
+
+class TestGetCleanLog(unittest.TestCase):
+    """Test get_clean_log rendering as turns are appended."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.gym = ClaudeGym(work_dir=self.tmpdir)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _turn(self, prompt, **kwargs):
+        defaults = dict(
+            prompt=prompt, result_text="ok", session_id=None, num_turns=1,
+            cost_usd=0.25, duration=1.0, is_error=False, raw_events_jsonl=b"",
+            tool_uses=[], file_diffs=[],
+        )
+        defaults.update(kwargs)
+        return TurnResult(**defaults)
+
+    def test_renders_new_turns(self):
+        self.gym.conversation_log.turns.append(self._turn(
+            "first", tool_uses=[{"name": "Edit", "id": "1"}],
+            file_diffs=[FileDiff("a.py", "added", "", None, None)],
+        ))
+        log_text = self.gym.get_clean_log()
+        self.assertIn("--- Turn 1 ---\nPrompt: first", log_text)
+        self.assertIn("Tools used: Edit", log_text)
+        self.assertIn("Files changed: a.py (added)", log_text)
+
+        self.gym.conversation_log.turns.append(self._turn("second", is_error=True))
+        log_text = self.gym.get_clean_log()
+        self.assertIn("--- Turn 2 ---\nPrompt: second", log_text)
+        self.assertIn("*** ERROR ***", log_text)
+        self.assertIn("Totals: $0.5000 | 2.0s | 2 turn(s)", log_text)
+
+    def test_replaced_log_is_rerendered(self):
+        self.gym.conversation_log.turns.append(self._turn("old"))
+        self.gym.get_clean_log()
+        self.gym.conversation_log.turns[:] = [self._turn("new")]
+        log_text = self.gym.get_clean_log()
+        self.assertIn("Prompt: new", log_text)
+        self.assertNotIn("Prompt: old", log_text)
+
+    def test_reset_starts_new_session(self):
+        self.gym.conversation_log.turns.append(self._turn("old"))
+        self.gym.get_clean_log()
+        self.gym._session_id = "abc"
+        self.gym.reset()
+        self.assertNotIn("--resume", self.gym._build_command("next"))
+        self.assertEqual(self.gym.conversation_log.turns, [])
+        self.assertNotIn("Prompt: old", self.gym.get_clean_log())
+
+
+class TestBuildEnv(unittest.TestCase):
+    """Test _build_env sanitizing and caching."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_env_built_once(self):
+        config = AgentConfig(env_vars={"EXTRA": "1"})
+        gym = ClaudeGym(work_dir=self.tmpdir, agent_config=config)
+        with patch.dict(os.environ, {"CLAUDECODE": "1"}):
+            env = gym._build_env()
+        self.assertNotIn("CLAUDECODE", env)
+        self.assertEqual(env["EXTRA"], "1")
+        self.assertIs(gym._build_env(), env)
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,18 +2,23 @@
 
 import json
 import os
+import sys
 import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 
 from config import (
+    _WHICH_CACHE,
+    _which,
     AgentConfig,
     build_base_command,
     build_env,
     load_config,
     resolve_flag,
+    run_setup_wizard,
     save_config,
+    smoke_test,
 )
 
 
@@ -125,5 +130,64 @@ class TestBuildEnv(unittest.TestCase):
         self.assertEqual(env["MY_KEY"], "my_val")
 
 
+
+class TestSmokeTest(unittest.TestCase):
+    """Test smoke_test against a stand-in CLI."""
+
+    def _config(self, script):
+        return AgentConfig(command=sys.executable, extra_args=["-c", script])
+
+    def test_passes_on_result_event(self):
+        config = self._config(
+            "print('banner'); print('{\"type\": \"result\"}')"
+        )
+        passed, message = smoke_test(config)
+        self.assertTrue(passed, message)
+
+    def test_uses_given_env(self):
+        config = self._config(
+            "import os; assert os.environ['SMOKE'] == '1'; "
+            "print('{\"type\": \"result\"}')"
+        )
+        passed, message = smoke_test(config, env={**os.environ, "SMOKE": "1"})
+        self.assertTrue(passed, message)
+
+    def test_fails_without_result_event(self):
+        passed, message = smoke_test(self._config("print('{}')"))
+        self.assertFalse(passed)
+        self.assertIn("No result event", message)
+
+
+class TestWhich(unittest.TestCase):
+    """Test the memoized PATH lookup."""
+
+    def setUp(self):
+        _WHICH_CACHE.clear()
+        self.addCleanup(_WHICH_CACHE.clear)
+
+    def test_misses_not_cached(self):
+        with patch("config.shutil.which", side_effect=[None, "/bin/tool"]) as which:
+            self.assertIsNone(_which("tool"))
+            self.assertEqual(_which("tool"), "/bin/tool")  # installed since
+            self.assertEqual(_which("tool"), "/bin/tool")
+        self.assertEqual(which.call_count, 2)
+
+
+class TestSetupWizard(unittest.TestCase):
+    """Test run_setup_wizard restart flow."""
+
+    def test_restart_after_failed_smoke_test(self):
+        answers = iter(["first-cmd", "", "r", "second-cmd", "", "s"])
+        results = iter([(False, "boom"), (True, "ok")])
+        with patch("config.config_exists", return_value=False), \
+                patch("config._which", return_value="/bin/x"), \
+                patch("config.smoke_test", side_effect=lambda c, env: next(results)), \
+                patch("config.save_config") as save, \
+                patch("builtins.input", side_effect=lambda _: next(answers)), \
+                patch("builtins.print"):
+            config = run_setup_wizard()
+        self.assertEqual(config.command, "second-cmd")
+        save.assert_called_once_with(config)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,30 @@
 """Tests for diff_server.py — feedback formatting."""
 
+import gzip
+import http.client
+import io
+import json
+import socket
+import threading
 import unittest
+import urllib.request
+from contextlib import redirect_stdout
+from unittest.mock import patch
 
-from diff_server import DiffFeedback, LineComment, _format_feedback
+from claude_gym import FileDiff
+from diff_server import (
+    _HTML_TEMPLATE,
+    DiffFeedback,
+    LineComment,
+    _DiffReviewHandler,
+    _build_html,
+    _create_server,
+    _encode_diff_payload,
+    _format_feedback,
+    _parse_unified_diff,
+    _terminal_fallback,
+    present_diff_for_review,
+)
 
 
 class TestFormatFeedback(unittest.TestCase):
@@ -47,5 +69,228 @@ class TestFormatFeedback(unittest.TestCase):
         self.assertEqual(result, "")
 
 
+
+class TestParseUnifiedDiff(unittest.TestCase):
+    """Test _parse_unified_diff's diff2html-shaped output."""
+
+    DIFF = (
+        "diff --git a/src/app.py b/src/app.py\n"
+        "index 1111111..2222222 100644\n"
+        "--- a/src/app.py\n"
+        "+++ b/src/app.py\n"
+        "@@ -1,3 +1,3 @@ def main():\n"
+        " keep\n"
+        "-old\n"
+        "+new\n"
+        "--- removed dashes\n"
+        "@@ -10 +10,2 @@\n"
+        " ctx\n"
+        "+added\n"
+        "\\ No newline at end of file\n"
+    )
+
+    def test_blocks_and_line_numbers(self):
+        parsed = _parse_unified_diff("src/app.py", self.DIFF)
+        self.assertEqual((parsed["oldName"], parsed["newName"]), ("src/app.py", "src/app.py"))
+        self.assertEqual(parsed["language"], "py")
+        self.assertEqual((parsed["addedLines"], parsed["deletedLines"]), (2, 2))
+        first, second = parsed["blocks"]
+        self.assertEqual(first["header"], "@@ -1,3 +1,3 @@ def main():")
+        self.assertEqual(
+            [(l["type"], l["oldNumber"], l["newNumber"]) for l in first["lines"]],
+            [("context", 1, 1), ("delete", 2, None), ("insert", None, 2), ("delete", 3, None)],
+        )
+        self.assertEqual(first["lines"][3]["content"], "--- removed dashes")
+        self.assertEqual((second["oldStartLine"], second["newStartLine"]), (10, 10))
+        self.assertEqual(len(second["lines"]), 2)
+
+    def test_new_file(self):
+        diff = (
+            "diff --git a/n.txt b/n.txt\nnew file mode 100644\n"
+            "--- /dev/null\n+++ b/n.txt\n@@ -0,0 +1 @@\n+hi\n"
+        )
+        parsed = _parse_unified_diff("n.txt", diff)
+        self.assertTrue(parsed["isNew"])
+        self.assertEqual(parsed["oldName"], "/dev/null")
+        self.assertEqual(parsed["blocks"][0]["lines"][0]["newNumber"], 1)
+
+    def test_no_hunks_returns_none(self):
+        diff = "diff --git a/b.bin b/b.bin\nBinary files a/b.bin and b/b.bin differ\n"
+        self.assertIsNone(_parse_unified_diff("b.bin", diff))
+
+
+class TestTerminalFallback(unittest.TestCase):
+    """Test _terminal_fallback input handling."""
+
+    def test_non_tty_stops_at_blank_line(self):
+        stdin = io.StringIO("first line\nsecond\n\ndone\ny\n")
+        with patch("sys.stdin", stdin), redirect_stdout(io.StringIO()):
+            self.assertEqual(_terminal_fallback([]), "first line\nsecond")
+        # Answers for later prompts are left unread
+        self.assertEqual(stdin.read(), "done\ny\n")
+
+    def test_tty_stops_at_blank_line(self):
+        stdin = io.StringIO()
+        stdin.isatty = lambda: True
+        with patch("sys.stdin", stdin), redirect_stdout(io.StringIO()), \
+                patch("builtins.input", side_effect=["one", "two", "", "ignored"]):
+            self.assertEqual(_terminal_fallback([]), "one\ntwo")
+
+
+class TestBuildHtml(unittest.TestCase):
+    """Test _build_html payload injection."""
+
+    def _payload(self, page: bytes) -> list:
+        text = page.decode()
+        start = text.index("window.__DIFF_DATA__ = ") + len("window.__DIFF_DATA__ = ")
+        return json.loads(text[start:text.index(";\n", start)])
+
+    def test_injects_diff_data(self):
+        page = b"".join(_build_html([FileDiff("a.py", "added", "+x\n", None, None)]))
+        self.assertNotIn(b"__DIFF_DATA_PLACEHOLDER__", page)
+        self.assertEqual(self._payload(page), [
+            {"path": "a.py", "path_html": "a.py", "status": "added", "unified_diff": "+x\n",
+             "parsed": None},
+        ])
+
+    def test_path_pre_escaped(self):
+        page = b"".join(_build_html([FileDiff('a<b>&"c.py', "added", "+x\n", None, None)]))
+        self.assertEqual(self._payload(page)[0]["path_html"], "a&lt;b&gt;&amp;&quot;c.py")
+
+    def test_non_ascii_kept_as_utf8(self):
+        page = b"".join(_build_html([FileDiff("café.py", "added", "+π = 3.14\n", None, None)]))
+        self.assertIn("café.py".encode(), page)
+        self.assertEqual(self._payload(page)[0]["unified_diff"], "+π = 3.14\n")
+
+    def test_undecodable_path_escaped(self):
+        # surrogateescape keeps a non-UTF-8 byte as a lone surrogate
+        path = b"caf\xe9.py".decode("utf-8", "surrogateescape")
+        page = b"".join(_build_html([FileDiff(path, "added", "+x\n", None, None)]))
+        self.assertIn(b"caf\\udce9.py", page)
+        self.assertEqual(self._payload(page)[0]["path"], path)
+
+    def test_script_close_tag_escaped(self):
+        diff = "+</script><script>alert(1)</script>\n"
+        page = b"".join(_build_html([FileDiff("a.html", "added", diff, None, None)]))
+        self.assertEqual(page.count(b"</script>"), _HTML_TEMPLATE.count("</script>"))
+        self.assertEqual(self._payload(page)[0]["unified_diff"], diff)
+
+    def test_head_chunk_ends_before_inline_script(self):
+        chunks = _build_html([FileDiff("a.py", "added", "+x\n", None, None)])
+        self.assertIn(b"diff2html-ui.min.js", chunks[0])
+        self.assertNotIn(b"__DIFF_DATA__", chunks[0])
+        self.assertTrue(chunks[1].startswith(b"<script>"))
+
+    def test_payload_reused_for_same_diffs(self):
+        first = _build_html([FileDiff("a.py", "added", "+x\n", None, None)])
+        second = _build_html([FileDiff("a.py", "added", "+x\n", None, None)])
+        self.assertIs(first[2], second[2])
+        changed = _build_html([FileDiff("a.py", "added", "+y\n", None, None)])
+        self.assertEqual(self._payload(b"".join(changed))[0]["unified_diff"], "+y\n")
+        self.assertEqual(_encode_diff_payload.cache_info().currsize, 1)
+
+
+class TestDiffReviewHandler(unittest.TestCase):
+    """Test the review server's HTTP endpoints."""
+
+    def setUp(self):
+        _DiffReviewHandler.html_chunks = [b"<html>", b"x" * 2000, b"</html>"]
+        self.page = b"".join(_DiffReviewHandler.html_chunks)
+        _DiffReviewHandler.html_gzip = None
+        _DiffReviewHandler.feedback_result = None
+        _DiffReviewHandler.feedback_event = threading.Event()
+        _DiffReviewHandler.cancelled = False
+        self.server = _create_server(_DiffReviewHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _get(self, path="/", headers=None):
+        req = urllib.request.Request(self.url + path, headers=headers or {})
+        with urllib.request.urlopen(req) as resp:
+            return resp.headers, resp.read()
+
+    def _post(self, path, body):
+        req = urllib.request.Request(self.url + path, data=body, method="POST")
+        with urllib.request.urlopen(req) as resp:
+            return resp.read()
+
+    def test_get_plain(self):
+        headers, body = self._get()
+        self.assertIsNone(headers.get("Content-Encoding"))
+        self.assertEqual(headers.get("Transfer-Encoding"), "chunked")
+        self.assertEqual(body, self.page)
+
+    def test_get_gzip(self):
+        headers, body = self._get(headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(headers.get("Content-Encoding"), "gzip")
+        self.assertLess(len(body), len(self.page))
+        self.assertEqual(gzip.decompress(body), self.page)
+        # Requests never fill the cache; present_diff_for_review does
+        self.assertIsNone(_DiffReviewHandler.html_gzip)
+        _DiffReviewHandler.html_gzip = [gzip.compress(self.page)]
+        _, again = self._get(headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(gzip.decompress(again), self.page)
+
+    def test_feedback_post(self):
+        self._post("/api/feedback", b'{"overall_feedback": "ok"}')
+        self.assertTrue(_DiffReviewHandler.feedback_event.is_set())
+        self.assertFalse(_DiffReviewHandler.cancelled)
+        self.assertEqual(_DiffReviewHandler.feedback_result, {"overall_feedback": "ok"})
+
+    def test_cancel_post(self):
+        self._post("/api/cancel", b"{}")
+        self.assertTrue(_DiffReviewHandler.feedback_event.is_set())
+        self.assertTrue(_DiffReviewHandler.cancelled)
+
+    def test_connections_not_kept_alive(self):
+        # A socket left open by one session must not reach the next one
+        conn = http.client.HTTPConnection(*self.server.server_address, timeout=2)
+        try:
+            conn.request("GET", "/")
+            resp = conn.getresponse()
+            self.assertEqual(resp.version, 11)
+            self.assertEqual(resp.getheader("Connection"), "close")
+            self.assertEqual(resp.read(), self.page)
+            conn.request("POST", "/api/feedback", body=b"{}")
+            resp = conn.getresponse()
+            self.assertEqual(resp.getheader("Connection"), "close")
+            resp.read()
+            self.assertIsNone(conn.sock)
+        finally:
+            conn.close()
+
+    def test_idle_connection_does_not_block(self):
+        # A connected client that never sends a request must not stall others
+        idle = socket.create_connection(self.server.server_address)
+        try:
+            req = urllib.request.Request(self.url + "/")
+            with urllib.request.urlopen(req, timeout=2) as resp:
+                self.assertEqual(resp.read(), self.page)
+        finally:
+            idle.close()
+
+class TestPresentDiffForReview(unittest.TestCase):
+    """Test a full review session against the real server."""
+
+    def _review(self, body):
+        def open_browser(url):
+            req = urllib.request.Request(url + "/api/feedback", data=body, method="POST")
+            threading.Thread(target=lambda: urllib.request.urlopen(req).read()).start()
+            return True
+
+        diffs = [FileDiff("a.py", "added", "+x\n", None, None)]
+        with patch("diff_server.webbrowser.open", open_browser), redirect_stdout(io.StringIO()):
+            return present_diff_for_review(diffs, timeout=5)
+
+    def test_event_reused_across_sessions(self):
+        event = _DiffReviewHandler.feedback_event
+        self.assertEqual(self._review(b'{"overall_feedback": "first"}'), "Overall: first")
+        self.assertEqual(self._review(b'{"overall_feedback": "second"}'), "Overall: second")
+        self.assertIs(_DiffReviewHandler.feedback_event, event)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,14 @@
 """Tests for evaluator.py — expectation verification and glob matching."""
 
+import ast
+import io
 import os
 import tempfile
+import threading
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from evaluator import (
     CheckResult,
@@ -13,7 +17,11 @@ from evaluator import (
     DiffExpectation,
     FileExpectation,
     SyntaxExpectation,
+    TaskDefinition,
+    TaskResult,
+    _count_lines,
     _glob_match,
+    _skip_commands_on_missing_files,
 )
 from claude_gym import ClaudeGym, FileDiff
 
@@ -48,6 +56,15 @@ class TestGlobMatch(unittest.TestCase):
         self.assertTrue(_glob_match("Tests/Unit/FooTests.swift", "Tests/**/*.swift"))
 
 
+class TestCountLines(unittest.TestCase):
+    """Test _count_lines against str.splitlines semantics."""
+
+    def test_matches_splitlines(self):
+        for content in ["", "\n", "a", "a\n", "a\nb", "a\nb\n", "\n\n", "a\n\nb",
+                        "a\r\nb\r", "a\x0cb\x85c\u2028d\u2029", "\x0b\x1c\x1d\x1e"]:
+            self.assertEqual(_count_lines(content), len(content.splitlines()), repr(content))
+
+
 class TestFileExpectationVerification(unittest.TestCase):
     """Test _verify_file_expectations with real temp directories."""
 
@@ -89,6 +106,39 @@ class TestFileExpectationVerification(unittest.TestCase):
         results = self.evaluator._verify_file_expectations(self.gym, [exp])
         self.assertFalse(all(r.passed for r in results))
 
+    def test_needle_in_both_lists(self):
+        exp = FileExpectation(
+            path="hello.py",
+            content_contains=["import os", "def hello", "import os"],
+            content_not_contains=["import os", "import sys"],
+        )
+        results = self.evaluator._verify_file_expectations(self.gym, [exp])
+        self.assertEqual([r.passed for r in results], [True, True, True, False, True])
+
+    def test_content_cache_shared_with_syntax_checks(self):
+        cache = {}
+        with patch.object(self.gym, "get_file_content", wraps=self.gym.get_file_content) as read:
+            self.evaluator._verify_file_expectations(self.gym, [
+                FileExpectation(path="hello.py", content_contains=["def hello"]),
+                FileExpectation(path="hello.py", min_lines=1),
+            ], cache)
+            results = self.evaluator._verify_syntax_expectations(
+                self.gym, [SyntaxExpectation(path="hello.py")], cache)
+        self.assertTrue(results[0].passed)
+        read.assert_called_once_with("hello.py")
+
+    def test_existence_only_does_not_read_file(self):
+        with patch.object(self.gym, "get_file_content") as read, \
+                patch.object(self.gym, "count_lines") as count:
+            results = self.evaluator._verify_file_expectations(self.gym, [
+                FileExpectation(path="hello.py"),
+                FileExpectation(path="src", should_exist=False),
+                FileExpectation(path="gone.py", should_exist=False),
+            ])
+        self.assertTrue(all(r.passed for r in results), [r.message for r in results])
+        read.assert_not_called()
+        count.assert_not_called()
+
     def test_regex_match_pass(self):
         exp = FileExpectation(path="hello.py", content_matches=[r"def \w+\(\):"])
         results = self.evaluator._verify_file_expectations(self.gym, [exp])
@@ -202,6 +252,55 @@ class TestCommandExpectationVerification(unittest.TestCase):
         self.assertFalse(results[0].passed)
         self.assertIn("not found", results[0].message)
 
+    def test_empty_command(self):
+        results = self.evaluator._verify_command_expectations(self.gym, [CommandExpectation()])
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0].passed)
+
+    def test_commands_run_sequentially_by_default(self):
+        # The second command sees the first one's output file
+        exps = [
+            CommandExpectation(command=["python3", "-c", "open('built', 'w').close()"]),
+            CommandExpectation(command=["python3", "-c", "open('built')"]),
+        ]
+        results = self.evaluator._verify_command_expectations(self.gym, exps)
+        self.assertTrue(all(r.passed for r in results))
+
+    def test_commands_run_concurrently_when_enabled(self):
+        # Each command marks itself, then waits for the other's mark: both
+        # succeed only if they run at the same time
+        script = (
+            "import os, sys, time\n"
+            "open(sys.argv[1], 'w').close()\n"
+            "deadline = time.time() + 5\n"
+            "while not os.path.exists(sys.argv[2]) and time.time() < deadline: time.sleep(0.01)\n"
+            "print(sys.argv[1] if os.path.exists(sys.argv[2]) else 'alone')\n"
+        )
+        exps = [
+            CommandExpectation(command=["python3", "-c", script, "a", "b"], stdout_contains=["a"]),
+            CommandExpectation(command=["python3", "-c", script, "b", "a"], stdout_contains=["b"]),
+        ]
+        evaluator = ClaudeEvaluator(command_parallelism=2)
+        results = evaluator._verify_command_expectations(self.gym, exps)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r.passed for r in results))
+        self.assertIn("'a'", results[1].target)
+        self.assertIn("'b'", results[3].target)
+
+    def test_skipped_commands_keep_expectation_order(self):
+        file_exps = [FileExpectation(path="gone.py")]
+        file_checks = [CheckResult("file", "gone.py", False, "File gone.py should exist but was not found")]
+        exps = [
+            CommandExpectation(command=["echo", "first"]),
+            CommandExpectation(command=["python3", "gone.py"]),
+            CommandExpectation(command=["echo", "last"]),
+        ]
+        results = self.evaluator._verify_commands_after_files(self.gym, file_exps, file_checks, exps)
+        self.assertEqual([r.target for r in results], [
+            "echo first (rc=0)", "python3 gone.py", "echo last (rc=0)",
+        ])
+        self.assertIn("Skipped", results[1].message)
+
 
 class TestDiffExpectationVerification(unittest.TestCase):
     """Test _verify_diff_expectations."""
@@ -287,6 +386,17 @@ class TestSyntaxExpectation(unittest.TestCase):
         results = self.evaluator._verify_syntax_expectations(self.gym, [exp])
         self.assertFalse(results[0].passed)
 
+    def test_parse_reused_within_call_only(self):
+        path = Path(self.tmpdir) / "mod.py"
+        path.write_text("x = 1\n")
+        exp = SyntaxExpectation(path="mod.py", language="python")
+        with patch("evaluator.ast.parse", wraps=ast.parse) as parse:
+            results = self.evaluator._verify_syntax_expectations(self.gym, [exp, exp])
+            self.assertEqual(parse.call_count, 1)
+            path.write_text("x = (\n")
+            results += self.evaluator._verify_syntax_expectations(self.gym, [exp])
+        self.assertEqual([r.passed for r in results], [True, True, False])
+
     def test_missing_file(self):
         exp = SyntaxExpectation(path="nope.py", language="python")
         results = self.evaluator._verify_syntax_expectations(self.gym, [exp])
@@ -303,6 +413,11 @@ class TestSyntaxExpectation(unittest.TestCase):
 class TestExpectationValidation(unittest.TestCase):
     """Test validate() methods on expectation dataclasses."""
 
+    def test_file_exp_precompiles_matches(self):
+        exp = FileExpectation(path="a.py", content_matches=[r"def \w+"])
+        self.assertEqual([p.pattern for p in exp._compiled_matches], [r"def \w+"])
+        self.assertIsNone(FileExpectation(path="a.py", content_matches=["[bad"])._compiled_matches)
+
     def test_file_exp_valid(self):
         exp = FileExpectation(path="foo.py")
         self.assertEqual(exp.validate(), [])
@@ -346,5 +461,93 @@ class TestExpectationValidation(unittest.TestCase):
         self.assertTrue(any("invalid status" in e for e in errors))
 
 
+class TestSkipCommandsOnMissingFiles(unittest.TestCase):
+    """Test fail-fast selection of commands that can't succeed."""
+
+    def test_skips_only_commands_naming_missing_files(self):
+        file_exps = [FileExpectation(path="calc.py"), FileExpectation(path="ok.py")]
+        file_checks = [
+            CheckResult("file", "calc.py", False, "File calc.py should exist but was not found"),
+            CheckResult("file", "ok.py contains 'x'", False, "Missing: 'x' in ok.py"),
+        ]
+        run_calc = CommandExpectation(command=["python3", "calc.py", "add", "1", "2"])
+        run_ok = CommandExpectation(command=["python3", "ok.py"])
+        to_run, skipped = _skip_commands_on_missing_files(file_exps, file_checks, [run_calc, run_ok])
+        self.assertEqual(to_run, [run_ok])
+        self.assertEqual(len(skipped), 1)
+        self.assertFalse(skipped[0].passed)
+        self.assertIn("skipped due to earlier failure", skipped[0].message)
+
+    def test_matches_whole_arguments_only(self):
+        file_exps = [FileExpectation(path="a.py")]
+        file_checks = [CheckResult("file", "a.py", False, "File a.py should exist but was not found")]
+        unrelated = [
+            CommandExpectation(command=["python3", "data.py"]),
+            CommandExpectation(command=["ls", "a.pyc"]),
+        ]
+        related = [
+            CommandExpectation(command=["python3", "./a.py"]),
+            CommandExpectation(command=["lint", "--file=a.py"]),
+        ]
+        to_run, skipped = _skip_commands_on_missing_files(file_exps, file_checks, unrelated + related)
+        self.assertEqual(to_run, unrelated)
+        self.assertEqual(len(skipped), 2)
+
+    def test_nothing_missing(self):
+        cmds = [CommandExpectation(command=["echo"])]
+        self.assertEqual(
+            _skip_commands_on_missing_files([FileExpectation(path="a.py")], [], cmds),
+            (cmds, []),
+        )
+
+
+class TestRunSuite(unittest.TestCase):
+    """Test run_suite ordering and concurrency (run_task stubbed out)."""
+
+    def _tasks(self, n):
+        return [TaskDefinition(name=f"t{i}", description="", prompt="") for i in range(n)]
+
+    def test_parallel_preserves_order_and_overlaps(self):
+        evaluator = ClaudeEvaluator(parallelism=3)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def fake_run_task(task):
+            barrier.wait()  # only passes if three tasks run concurrently
+            return task.name
+
+        evaluator.run_task = fake_run_task
+        self.assertEqual(evaluator.run_suite(self._tasks(3)), ["t0", "t1", "t2"])
+
+    def test_sequential_by_default(self):
+        evaluator = ClaudeEvaluator()
+        threads = []
+        evaluator.run_task = lambda task: threads.append(threading.current_thread()) or task.name
+        self.assertEqual(evaluator.run_suite(self._tasks(2)), ["t0", "t1"])
+        self.assertEqual(threads, [threading.main_thread()] * 2)
+
+
+
+class TestPrintReport(unittest.TestCase):
+    """Test print_report output."""
+
+    def test_report_lines(self):
+        task = TaskDefinition(name="Calc", description="calc task", prompt="")
+        result = TaskResult(
+            task=task, turns=[], passed=False, total_cost=0.5, clean_log="",
+            checks=[
+                CheckResult("file", "a.py", True, "Found: a.py"),
+                CheckResult("command", "x", False, "FAIL: x", details="l1\nl2"),
+            ],
+        )
+        out = io.StringIO()
+        with redirect_stdout(out):
+            ClaudeEvaluator.print_report([result])
+        self.assertEqual(out.getvalue(), "\n".join([
+            "", "=" * 60, "EVALUATION REPORT", "=" * 60,
+            "", "[FAIL] Calc", "  Description: calc task", "  Cost: $0.5000",
+            "  [+] Found: a.py", "  [-] FAIL: x", "      l1", "      l2",
+            "", "=" * 60, "Results: 0/1 tasks passed", "Total cost: $0.5000", "=" * 60,
+        ]) + "\n")
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,37 +1,70 @@
 """Tests for run_skill.py — validation, revert, path expansion."""
 
+import io
+import json
 import os
 import subprocess
+import sys
 import tempfile
+import time
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
 from unittest.mock import patch
 
-from run_skill import get_multiline_input, revert_changes, validate_project_dir
+from config import AgentConfig
+from evaluator import CheckResult, CommandExpectation, DiffExpectation, FileExpectation
+from run_skill import (
+    _count_status_entries,
+    _await_skill_update,
+    _in_background,
+    _kill_live_agents,
+    _run_agent,
+    _DERIVATION_RULES,
+    _DERIVE_CACHE,
+    _SKILLS_CACHE,
+    derive_expectations,
+    derive_skill_update,
+    discover_skills,
+    get_multiline_input,
+    load_session,
+    print_evaluation,
+    revert_changes,
+    run_evaluation,
+    save_session,
+    select_skill,
+    validate_project_dir,
+)
 
 
 class TestValidateProjectDir(unittest.TestCase):
     """Test validate_project_dir safety checks."""
 
     def test_blocks_root(self):
-        err = validate_project_dir(Path("/").resolve())
+        err, _ = validate_project_dir(Path("/").resolve())
         self.assertIsNotNone(err)
         self.assertIn("dangerous", err.lower())
 
     def test_blocks_home(self):
-        err = validate_project_dir(Path.home().resolve())
+        err, _ = validate_project_dir(Path.home().resolve())
         self.assertIsNotNone(err)
         self.assertIn("dangerous", err.lower())
 
     def test_blocks_script_dir(self):
         script_dir = Path(__file__).resolve().parent.parent
-        err = validate_project_dir(script_dir)
+        err, _ = validate_project_dir(script_dir)
         self.assertIsNotNone(err)
         self.assertIn("evaluator itself", err)
 
+    def test_allows_dir_inside_script_dir(self):
+        # Only the evaluator's dir and its ancestors are refused as containing it
+        script_dir = Path(__file__).resolve().parent.parent
+        err, _ = validate_project_dir(script_dir / "tests")
+        self.assertNotIn("evaluator itself", err)
+
     def test_blocks_non_git_dir(self):
         with tempfile.TemporaryDirectory() as tmpdir:
-            err = validate_project_dir(Path(tmpdir))
+            err, _ = validate_project_dir(Path(tmpdir))
         self.assertIsNotNone(err)
         self.assertIn("not a git repository", err)
 
@@ -42,7 +75,7 @@ class TestValidateProjectDir(unittest.TestCase):
             subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "init"],
                            cwd=tmpdir, check=True, capture_output=True)
             (Path(tmpdir) / "dirty.txt").write_text("uncommitted\n")
-            err = validate_project_dir(Path(tmpdir))
+            err, _ = validate_project_dir(Path(tmpdir))
         self.assertIsNotNone(err)
         self.assertIn("uncommitted", err)
 
@@ -52,8 +85,41 @@ class TestValidateProjectDir(unittest.TestCase):
                            capture_output=True)
             subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "init"],
                            cwd=tmpdir, check=True, capture_output=True)
-            err = validate_project_dir(Path(tmpdir))
+            err, branch = validate_project_dir(Path(tmpdir))
+            head = subprocess.run(["git", "symbolic-ref", "--short", "HEAD"], cwd=tmpdir,
+                                  capture_output=True, text=True).stdout.strip()
         self.assertIsNone(err)
+        self.assertEqual(branch, head)
+
+    def test_dirty_count_and_detached_head(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = lambda *args: subprocess.run(args, cwd=tmpdir, check=True, capture_output=True)
+            run("git", "init", "-q")
+            (Path(tmpdir) / "a.txt").write_text("a\n")
+            run("git", "add", "a.txt")
+            run("git", "commit", "-q", "-m", "init")
+            run("git", "checkout", "-q", "--detach")
+            run("git", "mv", "a.txt", "b.txt")
+            (Path(tmpdir) / "new.txt").write_text("new\n")
+            err, branch = validate_project_dir(Path(tmpdir))
+        self.assertIn("2 uncommitted", err)
+        self.assertEqual(branch, "detached HEAD")
+
+    def test_non_utf8_filename(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = lambda *args: subprocess.run(args, cwd=tmpdir, check=True, capture_output=True)
+            run("git", "init", "-q")
+            run("git", "commit", "-q", "--allow-empty", "-m", "init")
+            with open(os.path.join(os.fsencode(tmpdir), b"caf\xe9.txt"), "w") as f:
+                f.write("x\n")
+            err, _ = validate_project_dir(Path(tmpdir))
+        self.assertIn("1 uncommitted", err)
+
+    def test_count_status_entries(self):
+        self.assertEqual(_count_status_entries(""), 0)
+        # A rename's source path is its own NUL record, even one that looks like an entry
+        entries = "2 R. N... 100644 100644 100644 a b R100 new\x002 old\x00? u\x00"
+        self.assertEqual(_count_status_entries(entries), 2)
 
     def test_skip_clean_check(self):
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -62,8 +128,12 @@ class TestValidateProjectDir(unittest.TestCase):
             subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "init"],
                            cwd=tmpdir, check=True, capture_output=True)
             (Path(tmpdir) / "dirty.txt").write_text("uncommitted\n")
-            err = validate_project_dir(Path(tmpdir), skip_clean_check=True)
+            with patch("run_skill.subprocess.run", wraps=subprocess.run) as run:
+                err, branch = validate_project_dir(Path(tmpdir), skip_clean_check=True)
         self.assertIsNone(err)
+        self.assertNotEqual(branch, "unknown")
+        # Only the branch is wanted, so git skips the untracked-file walk
+        self.assertIn("--untracked-files=no", run.call_args.args[0])
 
 
 class TestRevertChanges(unittest.TestCase):
@@ -97,6 +167,25 @@ class TestRevertChanges(unittest.TestCase):
         revert_changes(self.project_dir, [], ["base.txt"])
         self.assertEqual((self.project_dir / "base.txt").read_text(), "original\n")
 
+    def test_restores_unusual_paths(self):
+        names = ["with space.txt", "star*.txt", "new\nline.txt"]
+        for name in names:
+            (self.project_dir / name).write_text("original\n")
+        subprocess.run(["git", "add", "-A"], cwd=self.tmpdir, check=True, capture_output=True)
+        subprocess.run(["git", "commit", "-q", "-m", "more"], cwd=self.tmpdir,
+                       check=True, capture_output=True)
+        for name in names:
+            (self.project_dir / name).write_text("changed\n")
+        # "star*.txt" is a literal path, not a glob over the other files
+        (self.project_dir / "base.txt").write_text("untouched\n")
+        for version in [(2, 39), (2, 20)]:  # restore, and the checkout fallback
+            with self.subTest(version=version), patch("run_skill._git_version", return_value=version):
+                revert_changes(self.project_dir, [], names)
+                for name in names:
+                    self.assertEqual((self.project_dir / name).read_text(), "original\n")
+                    (self.project_dir / name).write_text("changed\n")
+                self.assertEqual((self.project_dir / "base.txt").read_text(), "untouched\n")
+
     def test_removes_empty_parent_dirs(self):
         nested = self.project_dir / "a" / "b"
         nested.mkdir(parents=True)
@@ -106,6 +195,124 @@ class TestRevertChanges(unittest.TestCase):
         # Parent 'a' should also be removed since it's empty
         self.assertFalse((self.project_dir / "a").exists())
 
+    def test_removes_dirs_emptied_by_several_files(self):
+        for rel in ["a/b/c/one.py", "a/b/c/two.py", "a/d/three.py", "keep/new.py"]:
+            (self.project_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+            (self.project_dir / rel).write_text("x\n")
+        (self.project_dir / "keep" / "user.txt").write_text("mine\n")
+        revert_changes(self.project_dir, ["a/b/c/one.py", "a/d/three.py", "a/b/c/two.py",
+                                          "keep/new.py"], [])
+        self.assertFalse((self.project_dir / "a").exists())
+        self.assertEqual((self.project_dir / "keep" / "user.txt").read_text(), "mine\n")
+
+
+class TestRunEvaluation(unittest.TestCase):
+    """Test run_evaluation's check ordering."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        subprocess.run(["git", "init", "-q"], cwd=self.tmpdir, check=True,
+                       capture_output=True)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_commands_on_missing_files_skipped(self):
+        (Path(self.tmpdir) / "ok.py").write_text("print('ok')\n")
+        checks = run_evaluation(
+            Path(self.tmpdir),
+            [FileExpectation(path="calc.py"), FileExpectation(path="ok.py")],
+            [CommandExpectation(command=["python3", "calc.py"]),
+             CommandExpectation(command=["python3", "ok.py"], stdout_contains=["ok"])],
+        )
+        # calc.py missing: its command is skipped in place; ok.py's passes both checks
+        self.assertEqual([c.passed for c in checks], [False, False, True, True])
+        self.assertIn("Skipped `python3 calc.py`", checks[1].message)
+
+
+class TestPrintEvaluation(unittest.TestCase):
+    """Test print_evaluation's report text."""
+
+    def test_report(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            print_evaluation([
+                CheckResult("file", "a.py", True, "Found: a.py"),
+                CheckResult("command", "x", False, "FAIL: x", details="l1\nl2\nl3\nl4"),
+            ])
+        self.assertEqual(out.getvalue(), (
+            "\nEvaluation:\n"
+            "  [+] Found: a.py\n"
+            "  [-] FAIL: x\n"
+            "      l1\n      l2\n      l3\n"
+            "\nResults: 1/2 checks passed\n"
+        ))
+
+
+class TestGetMultilineInput(unittest.TestCase):
+    """Test get_multiline_input on piped and interactive stdin."""
+
+    def test_piped_stops_at_blank_line(self):
+        stdin = io.StringIO("first\nsecond\n\nnext answer\n")
+        with patch("sys.stdin", stdin), redirect_stdout(io.StringIO()):
+            self.assertEqual(get_multiline_input("Prompt:"), "first\nsecond")
+        # Later prompts still see the rest of the input
+        self.assertEqual(stdin.readline(), "next answer\n")
+
+    def test_piped_eof(self):
+        with patch("sys.stdin", io.StringIO("only\n")), redirect_stdout(io.StringIO()):
+            self.assertEqual(get_multiline_input("Prompt:"), "only")
+
+    def test_tty_uses_input(self):
+        stdin = io.StringIO()
+        stdin.isatty = lambda: True
+        with patch("sys.stdin", stdin), redirect_stdout(io.StringIO()), \
+                patch("builtins.input", side_effect=["one", "", "ignored"]):
+            self.assertEqual(get_multiline_input("Prompt:"), "one")
+
+
+class TestInBackground(unittest.TestCase):
+    """Test _in_background result and exception delivery."""
+
+    def test_result(self):
+        future = _in_background(lambda a, b=0: a + b, 1, b=2)
+        self.assertEqual(future.result(timeout=5), 3)
+
+    def test_exception(self):
+        future = _in_background(subprocess.check_call, ["false"])
+        with self.assertRaises(subprocess.CalledProcessError):
+            future.result(timeout=5)
+
+
+class TestRunAgent(unittest.TestCase):
+    """Test the one-shot agent runner."""
+
+    def test_passes_input_and_output(self):
+        proc = _run_agent([sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"],
+                          input="hi", timeout=10, env=dict(os.environ))
+        self.assertEqual((proc.returncode, proc.stdout), (0, "HI\n"))
+
+    def test_timeout_kills_grandchildren(self):
+        # The grandchild inherits the pipes; only killing the group ends the wait
+        script = ("import subprocess, sys, time; "
+                  "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+                  "time.sleep(30)")
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            _run_agent([sys.executable, "-c", script], input=None, timeout=0.5,
+                       env=dict(os.environ))
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_exit_kills_agent_running_in_background(self):
+        future = _in_background(_run_agent, [sys.executable, "-c", "import time; time.sleep(30)"],
+                                input=None, timeout=60, env=dict(os.environ))
+        start = time.monotonic()
+        while not future.done() and time.monotonic() - start < 5:
+            _kill_live_agents()  # what atexit does once the agent is listed
+            time.sleep(0.05)
+        self.assertEqual(future.result(timeout=5).returncode, -9)
+
 
 class TestPathExpansion(unittest.TestCase):
     """Test that path expansion handles ~, $HOME, and relative paths."""
@@ -121,5 +328,267 @@ class TestPathExpansion(unittest.TestCase):
         self.assertTrue(str(expanded).endswith("/testdir/sub"))
 
 
+
+class TestSessionRoundTrip(unittest.TestCase):
+    """Test save_session / load_session with frozen expectation types."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.session_file = Path(self.tmpdir) / "session.json"
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_expectations_round_trip(self):
+        file_exps = [FileExpectation(path="a.py", content_matches=["def \\w+"])]
+        cmd_exps = [CommandExpectation(command=["python3", "a.py"], stdout_contains=["ok"])]
+        diff_exps = [DiffExpectation(allowed_statuses=["added"])]
+        with patch("run_skill.SESSION_FILE", self.session_file):
+            save_session("skill", "task", "/proj", file_exps, cmd_exps, diff_exps, 2)
+            saved = load_session()
+        self.assertEqual([FileExpectation(**fe) for fe in saved["file_expectations"]], file_exps)
+        self.assertEqual([CommandExpectation(**ce) for ce in saved["command_expectations"]], cmd_exps)
+        self.assertEqual([DiffExpectation(**de) for de in saved["diff_expectations"]], diff_exps)
+        self.assertEqual(saved["run_number"], 2)
+
+
+class TestDiscoverSkills(unittest.TestCase):
+    """Test discover_skills frontmatter parsing and its stat-keyed cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        _SKILLS_CACHE.clear()
+        patcher = patch("run_skill.SKILLS_DIR", Path(self.tmpdir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        _SKILLS_CACHE.clear()
+
+    def _write(self, dirname, text):
+        skill_file = Path(self.tmpdir) / dirname / "SKILL.md"
+        skill_file.parent.mkdir(exist_ok=True)
+        skill_file.write_text(text)
+        return skill_file
+
+    def test_parses_frontmatter_in_dir_order(self):
+        self._write("b", "---\nname: Beta\ndescription: second\n---\nbody\n")
+        self._write("a", "no frontmatter\n")
+        (Path(self.tmpdir) / "c").mkdir()
+        (Path(self.tmpdir) / "stray.md").write_text("x")
+        skills = discover_skills()
+        self.assertEqual([(s["name"], s["description"]) for s in skills],
+                         [("a", ""), ("Beta", "second")])
+        self.assertNotIn("content", skills[1])
+
+    def test_select_reads_chosen_skill(self):
+        self._write("a", "---\nname: A\n---\nbody a\n")
+        self._write("b", "---\nname: B\n---\nbody b\n")
+        skills = discover_skills()
+        with patch("builtins.input", return_value="2"), patch("builtins.print"):
+            self.assertEqual(select_skill(skills), "---\nname: B\n---\nbody b\n")
+
+    def test_frontmatter_edge_cases(self):
+        self._write("open", "---\nname: Unclosed\nbody\n")
+        self._write("spaced", "--- \nname: Spaced\n---  \n")
+        self._write("late", "\n---\nname: Late\n---\n")
+        self.assertEqual([s["name"] for s in discover_skills()], ["late", "open", "Spaced"])
+
+    def test_missing_dir(self):
+        with patch("run_skill.SKILLS_DIR", Path(self.tmpdir) / "nope"):
+            self.assertEqual(discover_skills(), [])
+
+    def test_unchanged_files_not_reread(self):
+        skill_file = self._write("a", "---\nname: One\n---\n")
+        self.assertEqual(discover_skills()[0]["name"], "One")
+        # Same size and mtime: served from the cache without reading
+        st = skill_file.stat()
+        skill_file.write_text("---\nname: Two\n---\n")
+        os.utime(skill_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(discover_skills()[0]["name"], "One")
+        skill_file.write_text("---\nname: Three\n---\n")
+        self.assertEqual(discover_skills()[0]["name"], "Three")
+
+
+class TestDeriveExpectations(unittest.TestCase):
+    """Test the derivation command's prompt layout and output parsing."""
+
+    RESULT = '{"file_expectations": [{"path": "a.py"}]}'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = Path(self.tmpdir) / "v1"
+        patcher = patch("run_skill.DERIVE_CACHE_DIR", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _derive(self, config, feedback="needs tests", stdout=None):
+        import shutil
+        _DERIVE_CACHE.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if stdout is None:
+            stdout = json.dumps({"type": "result", "result": self.RESULT})
+        done = subprocess.CompletedProcess([], 0, stdout=stdout)
+        with patch("run_skill._run_agent", return_value=done) as run:
+            file_exps, _, _ = derive_expectations(feedback, "/proj", "write a.py", config)
+        self.assertEqual(file_exps, [FileExpectation(path="a.py")])
+        self.last_input = run.call_args.kwargs["input"]
+        return run.call_args.args[0]
+
+    def test_rules_sent_as_system_prompt(self):
+        cmd = self._derive(AgentConfig())
+        self.assertEqual(cmd[cmd.index("--system-prompt") + 1], _DERIVATION_RULES)
+        self.assertIn("needs tests", self.last_input)
+        self.assertNotIn("Rules:", self.last_input)
+        # The command is identical whatever the feedback
+        self.assertEqual(self._derive(AgentConfig(), "other"), cmd)
+
+    def test_rules_prefix_prompt_without_system_flag(self):
+        cmd = self._derive(AgentConfig(flag_overrides={"--system-prompt": None}))
+        self.assertNotIn("--system-prompt", cmd)
+        self.assertTrue(self.last_input.startswith(_DERIVATION_RULES))
+        self.assertIn("needs tests", self.last_input)
+
+    def test_prompt_sent_on_stdin(self):
+        cmd = self._derive(AgentConfig())
+        self.assertEqual(cmd[-1], "-p")
+        self.assertNotIn(self.last_input, cmd)
+        # An agent without -p gets the prompt as its last argument instead
+        cmd = self._derive(AgentConfig(flag_overrides={"-p": None}))
+        self.assertIsNone(self.last_input)
+        self.assertIn("needs tests", cmd[-1])
+        # A renamed flag gets the prompt as its value, as the smoke test sends it
+        cmd = self._derive(AgentConfig(flag_overrides={"-p": "--message"}))
+        self.assertIsNone(self.last_input)
+        self.assertEqual(cmd[-2], "--message")
+        self.assertIn("needs tests", cmd[-1])
+
+    def test_result_read_from_json_envelope(self):
+        cmd = self._derive(AgentConfig())
+        self.assertEqual(cmd[cmd.index("--output-format") + 1], "json")
+        fenced = f"Here you go:\n```json\n{self.RESULT}\n```\nDone."
+        self._derive(AgentConfig(), stdout=json.dumps({"type": "result", "result": fenced}))
+
+    def test_repeated_feedback_served_from_cache(self):
+        self.addCleanup(_DERIVE_CACHE.clear)
+        self._derive(AgentConfig())
+        done = subprocess.CompletedProcess([], 0, stdout=json.dumps({"result": self.RESULT}))
+        with patch("run_skill._run_agent", return_value=done) as run:
+            file_exps, cmd_exps, _ = derive_expectations("needs tests", "/proj", "write a.py")
+            derive_expectations("needs tests", "/other", "write a.py")
+        self.assertEqual(file_exps, [FileExpectation(path="a.py")])
+        self.assertEqual(cmd_exps, [])
+        # Only the changed project dir needed a new call
+        run.assert_called_once()
+
+    def test_memory_cache_bounded(self):
+        _DERIVE_CACHE.clear()
+        self.addCleanup(_DERIVE_CACHE.clear)
+        done = subprocess.CompletedProcess([], 0, stdout=json.dumps({"result": self.RESULT}))
+        with patch("run_skill._run_agent", return_value=done), \
+                patch("run_skill._DERIVE_CACHE_MAX", 2):
+            for feedback in ("one", "two", "three"):
+                derive_expectations(feedback, "/proj", "t")
+        self.assertEqual([key[0] for key in _DERIVE_CACHE], ["two", "three"])
+
+    def test_derivation_persisted_to_disk(self):
+        self.addCleanup(_DERIVE_CACHE.clear)
+        self._derive(AgentConfig())
+        self.assertEqual(len(list(self.cache_dir.glob("*.json"))), 1)
+        self.assertEqual(list(self.cache_dir.glob("*.tmp")), [])
+        # A later session (empty memory cache) reads it back without a call
+        _DERIVE_CACHE.clear()
+        with patch("run_skill._run_agent") as run:
+            file_exps, _, _ = derive_expectations("needs tests", "/proj", "write a.py")
+        run.assert_not_called()
+        self.assertEqual(file_exps, [FileExpectation(path="a.py")])
+
+    def test_corrupt_disk_entry_rederived(self):
+        self.addCleanup(_DERIVE_CACHE.clear)
+        self._derive(AgentConfig())
+        _DERIVE_CACHE.clear()
+        for entry in self.cache_dir.glob("*.json"):
+            entry.write_text("{not json")
+        done = subprocess.CompletedProcess([], 0, stdout=json.dumps({"result": self.RESULT}))
+        with patch("run_skill._run_agent", return_value=done) as run:
+            file_exps, _, _ = derive_expectations("needs tests", "/proj", "write a.py")
+        run.assert_called_once()
+        self.assertEqual(file_exps, [FileExpectation(path="a.py")])
+
+    def test_unknown_keys_dropped_and_defaults_applied(self):
+        result = json.dumps({
+            "file_expectations": [{"path": "a.py", "note": "extra"}],
+            "command_expectations": [{"command": ["make"], "why": "build", "shell": True}],
+        })
+        done = subprocess.CompletedProcess([], 0, stdout=json.dumps({"result": result}))
+        _DERIVE_CACHE.clear()
+        self.addCleanup(_DERIVE_CACHE.clear)
+        with patch("run_skill._run_agent", return_value=done):
+            file_exps, cmd_exps, diff_exps = derive_expectations("f", "/proj", "t")
+        self.assertEqual(file_exps, [FileExpectation(path="a.py")])
+        self.assertEqual(cmd_exps, [CommandExpectation(command=["make"])])
+        self.assertEqual(diff_exps, [])
+
+    def test_command_entry_without_command_rejected(self):
+        result = json.dumps({"command_expectations": [{"returncode": 0}]})
+        done = subprocess.CompletedProcess([], 0, stdout=json.dumps({"result": result}))
+        _DERIVE_CACHE.clear()
+        with patch("run_skill._run_agent", return_value=done), redirect_stdout(io.StringIO()):
+            self.assertEqual(derive_expectations("f", "/proj", "t"), ([], [], []))
+
+    def test_malformed_shapes_rejected(self):
+        for envelope in ({"result": {"file_expectations": []}},
+                         {"result": "[1, 2]"},
+                         {"result": json.dumps({"file_expectations": ["a.py"]})}):
+            done = subprocess.CompletedProcess([], 0, stdout=json.dumps(envelope))
+            _DERIVE_CACHE.clear()
+            with patch("run_skill._run_agent", return_value=done), redirect_stdout(io.StringIO()):
+                self.assertEqual(derive_expectations("f", "/proj", "t"), ([], [], []), envelope)
+
+    def test_build_only_feedback_skips_agent(self):
+        with patch("run_skill._run_agent") as run:
+            _, cmd_exps, _ = derive_expectations("`Swift build` must pass.", "/proj", "x")
+        run.assert_not_called()
+        self.assertEqual(cmd_exps, [CommandExpectation(command=["swift", "build"], timeout=120)])
+        # Anything beyond the command still goes to the agent
+        self._derive(AgentConfig(), "swift build must pass and add a test for a.py")
+
+    def test_plain_text_output_without_format_flag(self):
+        cmd = self._derive(AgentConfig(flag_overrides={"--output-format": None}),
+                           stdout=f"```\n{self.RESULT}\n```\n")
+        self.assertNotIn("--output-format", cmd)
+
+
+class TestDeriveSkillUpdate(unittest.TestCase):
+    """Test unwrapping of the revised skill text."""
+
+    SKILL = "Use:\n```bash\nmake test\n```\nthen commit."
+
+    def _update(self, stdout):
+        done = subprocess.CompletedProcess([], 0, stdout=stdout)
+        with patch("run_skill._run_agent", return_value=done):
+            return derive_skill_update("old skill", "feedback", "task")
+
+    def test_inner_fences_kept(self):
+        self.assertEqual(self._update(self.SKILL + "\n"), self.SKILL)
+
+    def test_errors_reported_by_waiter(self):
+        with patch("run_skill._run_agent", side_effect=subprocess.TimeoutExpired("claude", 90)):
+            update = _in_background(derive_skill_update, "old skill", "feedback", "task")
+            with redirect_stdout(io.StringIO()) as out:
+                self.assertIsNone(_await_skill_update(update))
+        self.assertIn("timed out", out.getvalue())
+
+    def test_wrapping_fence_removed(self):
+        self.assertEqual(self._update(f"```markdown\n{self.SKILL}\n```\n"), self.SKILL)
+
+
 if __name__ == "__main__":
     unittest.main()